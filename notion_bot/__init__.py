@@ -0,0 +1,7 @@
+"""Slack reminders for Notion cards stored in Snowflake.
+
+Importing the package has no side effects: clients are built on first use and heavy
+dependencies (slack_sdk, snowflake-connector, pandas) are imported by the code that needs them.
+"""
+
+__version__ = "0.1.0"
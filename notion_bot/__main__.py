@@ -0,0 +1,6 @@
+import sys
+from .cli import main
+
+# Guarded so that shard workers started with spawn do not rerun the CLI
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import logging
+import numpy as np
+import pandas as pd
+from .rules import TASK_INDEX, RECO_INDEX
+from .request import build_tasks_query, build_recommendations_query, SNOWFLAKE_PUSHDOWN
+from .records import TaskCard, Recommendation, reader
+from .metrics import metrics
+
+# Evaluates whole result batches with pandas/NumPy before handing rows to the rule engine.
+# Used when NOTION_BOT_BATCH_MODE=1; needs snowflake-connector-python[pandas].
+
+
+def cadence_mask(cadence, values):
+    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    mask = np.isin(numbers, cadence.values) if cadence.values else np.zeros(len(values), dtype=bool)
+    if cadence.start is not None:
+        with np.errstate(invalid='ignore'):
+            mask |= (numbers >= cadence.start) & (np.fmod(numbers - cadence.start, cadence.every) == 0)
+    return mask
+
+
+def rules_mask(index, statuses, facts):
+    # True for every row on which at least one rule of the index fires
+    size = len(next(iter(facts.values())))
+    matched = np.zeros(size, dtype=bool)
+    for rule in index.rules:
+        mask = np.ones(size, dtype=bool)
+        status = getattr(rule, 'status', None)
+        if status is not None:
+            mask &= (statuses == status).to_numpy()
+        for fact, expected in rule.requires:
+            mask &= facts[fact] if expected else ~facts[fact]
+        if rule.cadence is not None:
+            mask &= cadence_mask(rule.cadence, facts[rule.cadence.field])
+        matched |= mask
+    return matched
+
+
+def _present(column):
+    return (column.notna() & (column.astype(str) != '')).to_numpy()
+
+
+def _days(later, earlier):
+    return (later - earlier).dt.days.astype('Int64')
+
+
+def _dates(column):
+    # Read like rules.to_date: the calendar day of a timestamp in its own timezone, or the first
+    # 10 characters of an ISO string; empty or malformed values are NaT
+    if pd.api.types.is_datetime64_any_dtype(column):
+        if column.dt.tz is not None:
+            column = column.dt.tz_localize(None)
+        return column.dt.normalize()
+    return pd.to_datetime(column.astype(str).str[:10], format="%Y-%m-%d", errors='coerce')
+
+
+def task_facts(df, today):
+    sla_dates = _dates(df['SLA_PUT_ON_HOLD_ON'])
+    return {
+        'lead_time': pd.to_numeric(df['LEAD_TIME'], errors='coerce'),
+        'days_since_sla': _days(pd.Timestamp(today), sla_dates),
+        'sla': sla_dates.notna().to_numpy(),
+        'creator': _present(df['MAIL']),
+    }
+
+
+def reco_facts(df, today):
+    postponed = df['FORMATTED_ETA_POSTPONED'].replace('', None)
+    eta_dates = pd.to_datetime(postponed.fillna(df['FORMATTED_INITIAL_ETA']), format="%d/%m/%Y", errors='coerce')
+    days_until_eta = _days(eta_dates, pd.Timestamp(today))
+    return {
+        'days_until_eta': days_until_eta,
+        'days_late': -days_until_eta,
+        'owner': _present(df['OWNER_RECO']),
+    }
+
+
+def matching_rows(df, index, facts, record_type):
+    # Hand only the rows that fire a rule to the per-row messaging stage as records, with NaN/NaT turned into None
+    selected = df[rules_mask(index, df.get('STATUS'), facts)]
+    values = selected.astype(object).where(selected.notna(), None)
+    return map(reader(record_type, list(df.columns)), values.itertuples(index=False, name=None))
+
+
+def stream_batches(conn, query, params, label):
+    with conn.cursor() as cur:
+        with metrics.timer('query'):
+            cur.execute(query, params)
+        scanned = 0
+        batches = cur.fetch_pandas_batches()
+        while True:
+            with metrics.timer('fetch'):
+                df = next(batches, None)
+            if df is None:
+                break
+            scanned += len(df)
+            yield df
+        logging.info(f"Batch evaluation scanned {scanned} {label}.")
+
+
+def iter_task_rows(conn, today, pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    query, params = build_tasks_query(pushdown, shard)
+    if pushdown:
+        params['today'] = today
+    for df in stream_batches(conn, query, params, "rows"):
+        with metrics.timer('decision'):
+            records = matching_rows(df, TASK_INDEX, task_facts(df, today), TaskCard)
+        yield from records
+
+
+def iter_recommendation_rows(conn, today, pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    query, params = build_recommendations_query(pushdown, shard)
+    if pushdown:
+        params['today'] = today
+    for df in stream_batches(conn, query, params, "recommendations"):
+        with metrics.timer('decision'):
+            records = matching_rows(df, RECO_INDEX, reco_facts(df, today), Recommendation)
+        yield from records
@@ -0,0 +1,113 @@
+import re
+import time
+import zlib
+import itertools
+from datetime import date
+from ..rules import evaluate_task, evaluate_recommendation
+from ..request import TASKS_TABLE, TASK_COLUMNS, RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS
+from ..records import TaskCard, Recommendation, reader
+
+
+SHARD_PATTERN = re.compile(r"MOD\(ABS\(HASH\((\w+)\)\), (\d+)\) = (\d+)")
+
+
+class FakeConnection:
+    """DB-API stand-in for a Snowflake connection serving synthetic rows.
+
+    `tables` maps a table name to (columns, row factory); the factory is called
+    on every execute so large tables are generated lazily. When a query has a
+    WHERE clause, rows are filtered with the rule engine to emulate pushdown;
+    the time spent doing that is kept in `server_seconds` so reports can
+    separate it from the bot's own work. Shard predicates are emulated with
+    CRC32 standing in for Snowflake's HASH.
+    """
+
+    def __init__(self, tables, today=None):
+        self.tables = tables
+        self.today = today or date.today()
+        self.queries = 0
+        self.rows_fetched = 0
+        self.server_seconds = 0.0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def execute(self, query, params=None):
+        self.conn.queries += 1
+        table = re.search(r"FROM\s+(\w+)", query).group(1)
+        columns, factory = self.conn.tables[table]
+        self.description = [(column, None, None, None, None, None, True) for column in columns]
+        rows = factory()
+        where = query.split('WHERE', 1)[1] if 'WHERE' in query else ''
+        shard = SHARD_PATTERN.search(where)
+        if shard:
+            rows = self._shard(rows, columns.index(shard.group(1)), int(shard.group(2)), int(shard.group(3)))
+        if SHARD_PATTERN.sub('', where).strip():
+            # Filters for the day the query binds, which may differ from the day the rows were made for
+            rows = self._pushdown(rows, columns, table, (params or {}).get('today', self.conn.today))
+        self._rows = rows
+        return self
+
+    def fetchmany(self, size=1):
+        batch = list(itertools.islice(self._rows, size))
+        self.conn.rows_fetched += len(batch)
+        return batch
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self.conn.rows_fetched += len(rows)
+        return rows
+
+    def fetch_pandas_batches(self, batch_size=10000):
+        import pandas as pd
+        columns = [column[0] for column in self.description]
+        while True:
+            batch = self.fetchmany(batch_size)
+            if not batch:
+                break
+            yield pd.DataFrame(batch, columns=columns)
+
+    def close(self):
+        self._rows = iter(())
+
+    def _shard(self, rows, position, count, index):
+        return (row for row in rows if zlib.crc32(str(row[position]).encode()) % count == index)
+
+    def _pushdown(self, rows, columns, table, today):
+        evaluate = evaluate_task if table == TASKS_TABLE else evaluate_recommendation
+        build = reader(TaskCard if table == TASKS_TABLE else Recommendation, columns)
+        for row in rows:
+            started = time.perf_counter()
+            fires = evaluate(build(row), today, 'poc')[0]
+            self.conn.server_seconds += time.perf_counter() - started
+            if fires:
+                yield row
+
+
+def synthetic_connection(task_count, reco_count, today=None, seed=0):
+    from .synthetic import task_rows, recommendation_rows
+    today = today or date.today()
+    return FakeConnection({
+        TASKS_TABLE: (TASK_COLUMNS, lambda: task_rows(task_count, today, seed)),
+        RECOMMENDATIONS_TABLE: (RECOMMENDATION_COLUMNS, lambda: recommendation_rows(reco_count, today, seed)),
+    }, today)
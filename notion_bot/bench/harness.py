@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import date
+
+# Offline benchmark: synthetic Snowflake rows in, local Slack stub out.
+#   notion-bot bench --rows 1000 10000 100000 1000000 --job all --latency-ms 30 --rate-limit 600
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='notion-bot bench', description="Benchmark the bot against a fake Snowflake cursor and a local Slack stub.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000], help="table sizes to run, one run per size")
+    parser.add_argument('--job', choices=('tasks', 'recos', 'all'), default='all')
+    parser.add_argument('--latency-ms', type=float, default=20, help="latency the Slack stub adds to every call")
+    parser.add_argument('--rate-limit', type=int, default=0, help="requests per minute per method before the stub answers 429 (0: unlimited)")
+    parser.add_argument('--client-rate-scale', type=float, default=1, help="SLACK_RATE_LIMIT_SCALE for the bot's own token buckets (1: Slack's published limits)")
+    parser.add_argument('--no-pushdown', action='store_true', help="fetch whole tables instead of emulating SQL filtering")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help="extra bot configuration, e.g. SLACK_DIGEST_MODE=1")
+    parser.add_argument('--verbose', action='store_true', help="keep the bot's per-row INFO logs")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def run_once(args, rows):
+    from .slack_stub import SlackStub
+    from .fake_snowflake import synthetic_connection
+    from .synthetic import directory
+
+    rate_limits = {}
+    if args.rate_limit:
+        rate_limits = {method: args.rate_limit for method in ('users.lookupByEmail', 'chat.postMessage', 'users.list')}
+    stub = SlackStub(latency=args.latency_ms / 1000, rate_limits=rate_limits, directory=directory()).start()
+    workdir = tempfile.mkdtemp(prefix='notion-bot-bench-')
+    os.environ.update({
+        'SLACK_API_TOKEN': 'xoxb-bench',
+        'SLACK_API_URL': stub.url,
+        'SLACK_RATE_LIMIT_SCALE': str(args.client_rate_scale),
+        'SLACK_USER_CACHE_PATH': os.path.join(workdir, 'slack_user_cache.db'),
+        'NOTION_BOT_STATE_PATH': os.path.join(workdir, 'notion_bot_state.db'),
+        'SLACK_SPILL_PATH': os.path.join(workdir, 'slack_undelivered.jsonl'),
+        # Measure delivery, not backoff waits: failed messages stay in the outbox
+        'NOTION_OUTBOX_RETRY_WINDOW': '0',
+        'SNOWFLAKE_PUSHDOWN': '0' if args.no_pushdown else '1',
+        # Start from a warm user cache, like a daemon; --env SLACK_USER_CACHE_WARM=0 measures a cold one
+        'SLACK_USER_CACHE_WARM': '1',
+    })
+    os.environ.update(entry.split('=', 1) for entry in args.env)
+
+    # The bot reads its configuration at import time, so import it once the environment points at the stubs
+    from .. import notifier, runner
+    from ..metrics import metrics
+    from ..slack_cache import SLACK_USER_CACHE_WARM
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    task_count = rows if args.job in ('tasks', 'all') else 0
+    reco_count = rows if args.job in ('recos', 'all') else 0
+    conn = synthetic_connection(task_count, reco_count, date.today())
+
+    if SLACK_USER_CACHE_WARM:
+        notifier.clients.user_cache.warm()
+        metrics.reset()
+
+    # run() flushes: digests, the outbox retry and the dispatcher drain are part of the timed run
+    started = time.perf_counter()
+    runner.runner_for(args.job)(conn)
+    elapsed = time.perf_counter() - started
+    dispatch = notifier.clients.dispatcher.drain()
+    notifier.close()
+    stub.stop()
+
+    cards = task_count + reco_count
+    api_calls = sum(stub.calls.values())
+    messages = stub.calls['chat.postMessage'] - stub.rate_limited.get('chat.postMessage', 0)
+    stages = metrics.snapshot()['stages']
+    seconds = {stage: timer['seconds'] for stage, timer in stages.items()}
+    # rows/sec covers reading and deciding only; Slack delivery is reported as messages/sec
+    fetch_seconds = max(seconds.get('query', 0) + seconds.get('fetch', 0) - conn.server_seconds, 0)
+    decision_seconds = seconds.get('decision', 0)
+    return {
+        'job': args.job,
+        'cards': cards,
+        'rows_fetched': conn.rows_fetched,
+        'seconds': round(elapsed, 3),
+        'emulated_pushdown_seconds': round(conn.server_seconds, 3),
+        'fetch_seconds': round(fetch_seconds, 3),
+        'decision_seconds': round(decision_seconds, 3),
+        'rows_per_second': round(cards / max(fetch_seconds + decision_seconds, 1e-9), 1),
+        'client_rate_scale': args.client_rate_scale,
+        'messages': messages,
+        'messages_per_second': round(messages / elapsed, 1),
+        'api_calls': dict(stub.calls),
+        'api_calls_per_card': round(api_calls / cards, 4) if cards else 0,
+        'stub_rate_limited': dict(stub.rate_limited),
+        'dispatch': dispatch,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': stages,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def print_report(report):
+    print(f"{report['job']} x {report['cards']} cards: {report['seconds']}s "
+          f"({report['emulated_pushdown_seconds']}s emulating SQL filters)")
+    print(f"  rows/sec            {report['rows_per_second']} "
+          f"({report['fetch_seconds']}s fetching, {report['decision_seconds']}s deciding)")
+    print(f"  messages/sec        {report['messages_per_second']} ({report['messages']} messages, "
+          f"client rate scale {report['client_rate_scale']})")
+    print(f"  API calls per card  {report['api_calls_per_card']} {report['api_calls']}")
+    print(f"  429s from stub      {report['stub_rate_limited']}")
+    print(f"  dispatch            {report['dispatch']}")
+    print(f"  peak RSS            {report['peak_rss_mb']} MB")
+    for stage, timer in report['stages'].items():
+        print(f"  {stage:<20}{timer['seconds']:.3f}s over {timer['count']} calls")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(args.rows) == 1:
+        reports = [run_once(args, args.rows[0])]
+    else:
+        # Module-level clients and peak RSS are per process: run each size in a fresh interpreter
+        rows_at = argv.index('--rows')
+        base = [arg for arg in argv[:rows_at] + argv[rows_at + 1 + len(args.rows):] if arg != '--json']
+        reports = []
+        for rows in args.rows:
+            output = subprocess.run(
+                [sys.executable, '-m', 'notion_bot.bench', '--rows', str(rows), '--json'] + base,
+                check=True, capture_output=True, text=True
+            ).stdout
+            reports.append(json.loads(output.strip().splitlines()[-1]))
+    for report in reports:
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print_report(report)
+
@@ -0,0 +1,117 @@
+import json
+import time
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _user_id(email):
+    return 'U' + email.split('@')[0].upper()
+
+
+class SlackStub:
+    """Local stand-in for the Slack Web API methods the bot calls.
+
+    Every call waits `latency` seconds. With `rate_limits` (requests per minute
+    by method) a method answers HTTP 429 with a Retry-After header once its
+    sliding one-minute window is full, like Slack does. Emails containing
+    "unknown" get `users_not_found`. users.list pages through `directory`,
+    a list of emails, with the same user IDs users.lookupByEmail returns.
+    """
+
+    def __init__(self, latency=0.0, rate_limits=None, retry_after=1, directory=()):
+        self.latency = latency
+        self.directory = list(directory)
+        self.rate_limits = rate_limits or {}
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self, method):
+        limit = self.rate_limits.get(method)
+        with self._lock:
+            self.calls[method] += 1
+            if not limit:
+                return True
+            window = self._windows.setdefault(method, deque())
+            now = time.monotonic()
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= limit:
+                self.rate_limited[method] += 1
+                return False
+            window.append(now)
+            return True
+
+    def _respond(self, method, params):
+        if method == 'users.lookupByEmail':
+            email = params.get('email', '')
+            if 'unknown' in email:
+                return {'ok': False, 'error': 'users_not_found'}
+            return {'ok': True, 'user': {'id': _user_id(email)}}
+        if method == 'users.list':
+            start, limit = int(params.get('cursor') or 0), int(params.get('limit') or 200)
+            page = self.directory[start:start + limit]
+            next_cursor = str(start + limit) if start + limit < len(self.directory) else ''
+            members = [{'id': _user_id(email), 'profile': {'email': email}} for email in page]
+            return {'ok': True, 'members': members, 'response_metadata': {'next_cursor': next_cursor}}
+        if method == 'chat.postMessage':
+            return {'ok': True, 'channel': params.get('channel'), 'ts': f"{time.time():.6f}"}
+        return {'ok': False, 'error': 'unknown_method'}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                self._answer(url.path, {key: values[0] for key, values in parse_qs(url.query).items()})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(body or '{}')
+                else:
+                    params = {key: values[0] for key, values in parse_qs(body).items()}
+                self._answer(urlparse(self.path).path, params)
+
+            def _answer(self, path, params):
+                method = path.rsplit('/', 1)[-1]
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub._admit(method):
+                    status, headers, payload = 200, {}, stub._respond(method, params)
+                else:
+                    status, headers, payload = 429, {'Retry-After': str(stub.retry_after)}, {'ok': False, 'error': 'ratelimited'}
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
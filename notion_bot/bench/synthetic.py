@@ -0,0 +1,72 @@
+import random
+from datetime import timedelta
+from ..rules import STATUS_REVIEWERS_ON_IT, STATUS_ON_HOLD, STATUS_PENDING_INFO, REVIEWER_VALIDATIONS
+from ..request import TASK_COLUMNS, RECOMMENDATION_COLUMNS
+
+# Every value the rules distinguish, plus neighbours that must not fire
+STATUSES = [STATUS_REVIEWERS_ON_IT, STATUS_ON_HOLD, STATUS_PENDING_INFO, '✅ Done', '📝 Draft']
+LEAD_TIMES = [None] + list(range(0, 21))
+SLA_AGES = [None] + list(range(0, 66))
+ETA_OFFSETS = [None] + list(range(-30, 31))
+
+
+KINDS = ('creator', 'reviewer', 'owner', 'requestor')
+KNOWN_PER_KIND = 500
+
+
+def _email(kind, i):
+    # Every 50th address is unknown to the Slack stub, to exercise users_not_found
+    return f"unknown.{kind}{i}@example.com" if i % 50 == 0 else f"{kind}{i % KNOWN_PER_KIND}@example.com"
+
+
+def directory():
+    # Every known address the rows can hold, for the Slack stub's users.list
+    return [f"{kind}{i}@example.com" for kind in KINDS for i in range(KNOWN_PER_KIND)]
+
+
+def task_rows(count, today, seed=0):
+    """Yields `count` notion_table rows as tuples in TASK_COLUMNS order.
+
+    Statuses, LEAD_TIME values and SLA ages are drawn uniformly from the values
+    the rules distinguish, so even small samples exercise every rule. The same
+    seed always yields the same rows.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        status, lead_time, sla_age = rng.choice(STATUSES), rng.choice(LEAD_TIMES), rng.choice(SLA_AGES)
+        has_creator = rng.random() < 0.9
+        row = {
+            'ID': f"card-{i}",
+            'REQUEST': f"Request {i}",
+            'STATUS': status,
+            'LINK': f"https://www.notion.so/card-{i}",
+            'LEAD_TIME': lead_time,
+            'SLA_PUT_ON_HOLD_ON': None if sla_age is None else today - timedelta(days=sla_age),
+            'MAIL': _email('creator', i) if has_creator else None,
+        }
+        for validation, email_field in REVIEWER_VALIDATIONS:
+            row[validation] = 'Validated' if rng.random() < 0.5 else None
+            row[email_field] = _email('reviewer', rng.randrange(1000)) if rng.random() < 0.7 else None
+        yield tuple(row[column] for column in TASK_COLUMNS)
+
+
+def recommendation_rows(count, today, seed=0):
+    # Yields `count` recommendation rows as tuples in RECOMMENDATION_COLUMNS order
+    rng = random.Random(seed)
+    for i in range(count):
+        eta_offset, postponed = rng.choice(ETA_OFFSETS), rng.choice(('none', 'empty', 'later'))
+        has_owner, has_creator = rng.random() < 0.9, rng.random() < 0.9
+        initial_eta = None if eta_offset is None else today + timedelta(days=eta_offset)
+        row = {
+            'RECO': f"https://www.notion.so/reco-{i}",
+            'CONDITION': f"Condition {i}",
+            'OWNER_RECO': _email('owner', i) if has_owner else None,
+            'CREATOR_RECO': _email('requestor', rng.randrange(1000)) if has_creator else None,
+            'FORMATTED_INITIAL_ETA': initial_eta.strftime("%d/%m/%Y") if initial_eta else None,
+            'FORMATTED_ETA_POSTPONED': {
+                'none': None,
+                'empty': '',
+                'later': (initial_eta + timedelta(days=7)).strftime("%d/%m/%Y") if initial_eta else None,
+            }[postponed],
+        }
+        yield tuple(row[column] for column in RECOMMENDATION_COLUMNS)
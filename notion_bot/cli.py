@@ -0,0 +1,90 @@
+import sys
+import logging
+import argparse
+from importlib import import_module
+from . import __version__
+
+# Entry point of the `notion-bot` command. Each command imports only what it needs, so
+# `notion-bot --help` or a replayed dry run never loads slack_sdk or the Snowflake connector.
+#   notion-bot run tasks|recos|all [--shards N [--shard K ...] [--workers W]]
+#   notion-bot daemon
+#   notion-bot plan | record | bench ...
+
+JOBS = ('tasks', 'recos', 'all')
+
+# Commands that parse their own options
+DELEGATED = {
+    'plan': lambda argv: import_module('notion_bot.planner').main(argv),
+    'record': lambda argv: import_module('notion_bot.planner').main(argv),
+    'bench': lambda argv: import_module('notion_bot.bench.harness').main(argv[1:]),
+}
+
+
+def has_slack_token():
+    from .clients import SLACK_TOKEN
+    if not SLACK_TOKEN:
+        logging.error("SLACK_API_TOKEN is not set. Please set the SLACK_API_TOKEN environment variable.")
+        return False
+    return True
+
+
+def run(args):
+    if not has_slack_token():
+        return 1
+    if args.shards:
+        from .shards import run_sharded
+        return 0 if run_sharded(args.job, args.shards, args.shard, args.workers) else 1
+    if args.shard or args.workers:
+        logging.error("--shard and --workers need --shards.")
+        return 2
+    return 0 if import_module('notion_bot.runner').main(args.job) else 1
+
+
+def daemon(args):
+    if not has_slack_token():
+        return 1
+    from .daemon import run_daemon, NOTION_BOT_SCHEDULE
+    run_daemon(args.schedule or NOTION_BOT_SCHEDULE)
+    return 0
+
+
+def query(args):
+    from .request import main as check_queries
+    return 0 if check_queries() else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='notion-bot', description="Slack reminders for Notion cards stored in Snowflake.")
+    parser.add_argument('--version', action='version', version=f"%(prog)s {__version__}")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    run_parser = commands.add_parser('run', help="run a job once and deliver its messages")
+    run_parser.add_argument('job', choices=JOBS, help="tasks, recos, or all (both jobs on one Snowflake session)")
+    run_parser.add_argument('--shards', type=int, help="split the cards into this many hash partitions, each run once per day")
+    run_parser.add_argument('--shard', type=int, action='append', metavar='K',
+                            help="only run shard K (0-based, repeatable); by default every shard not yet leased is run")
+    run_parser.add_argument('--workers', type=int, help="worker processes for the shards (default: one per shard)")
+    run_parser.set_defaults(handler=run)
+    daemon_parser = commands.add_parser('daemon', help="run the jobs on a daily schedule")
+    daemon_parser.add_argument('--schedule', help="comma-separated job@HH:MM entries (default: NOTION_BOT_SCHEDULE)")
+    daemon_parser.set_defaults(handler=daemon)
+    query_parser = commands.add_parser('query', help="print the first rows of both queries to check the Snowflake setup")
+    query_parser.set_defaults(handler=query)
+    commands.add_parser('plan', help="write the notifications a run would send as JSONL, without Slack")
+    commands.add_parser('record', help="save a job's table to a JSONL snapshot for replays")
+    commands.add_parser('bench', help="benchmark against a fake Snowflake cursor and a local Slack stub")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if argv and argv[0] in DELEGATED:
+        return DELEGATED[argv[0]](argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'shards', None) is not None:
+        if args.shards < 1:
+            parser.error("--shards must be at least 1")
+        if any(not 0 <= shard < args.shards for shard in args.shard or ()):
+            parser.error(f"--shard must be between 0 and {args.shards - 1}")
+    return args.handler(args)
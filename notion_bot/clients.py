@@ -0,0 +1,70 @@
+import os
+import threading
+from .dispatch import RateLimitedClient, Dispatcher
+from .digest import DigestCollector
+from .slack_cache import SlackUserCache
+from .state import StateStore
+
+# Slack configuration
+SLACK_TOKEN = os.getenv('SLACK_API_TOKEN')
+SLACK_API_URL = os.getenv('SLACK_API_URL', 'https://slack.com/api/')
+ADMIN = 'admin_username'  # Anonymized admin username
+
+
+class Clients:
+    """Builds the Slack client, user cache, dispatcher, digest and state store on first use.
+
+    Importing the package creates nothing and does not load slack_sdk, so commands that never
+    talk to Slack start fast. One instance is shared by all the jobs of a process.
+    """
+
+    def __init__(self, token=None, api_url=None):
+        self.token = token
+        self.api_url = api_url
+        self._built = {}
+        self._lock = threading.RLock()
+
+    @property
+    def slack(self):
+        return self._get('slack', self._build_slack)
+
+    @property
+    def user_cache(self):
+        return self._get('user_cache', lambda: SlackUserCache(self.slack))
+
+    @property
+    def dispatcher(self):
+        return self._get('dispatcher', lambda: Dispatcher(self.slack, self.user_cache, f"{ADMIN}@example.com"))
+
+    @property
+    def digest(self):
+        return self._get('digest', DigestCollector)
+
+    @property
+    def state(self):
+        return self._get('state', StateStore)
+
+    def built(self, name):
+        with self._lock:
+            return name in self._built
+
+    def close(self):
+        # Release what was built; the next access builds fresh clients
+        with self._lock:
+            built, self._built = self._built, {}
+        for name in ('dispatcher', 'user_cache', 'state'):
+            if name in built:
+                getattr(built[name], 'shutdown' if name == 'dispatcher' else 'close')()
+
+    def _get(self, name, build):
+        with self._lock:
+            if name not in self._built:
+                self._built[name] = build()
+            return self._built[name]
+
+    def _build_slack(self):
+        from slack_sdk import WebClient
+        token = self.token or SLACK_TOKEN
+        if not token:
+            raise RuntimeError("SLACK_API_TOKEN is not set. Please set the SLACK_API_TOKEN environment variable.")
+        return RateLimitedClient(WebClient(token=token, base_url=self.api_url or SLACK_API_URL))
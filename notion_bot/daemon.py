@@ -0,0 +1,110 @@
+import os
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from .request import get_snowflake_connection
+from .slack_cache import SLACK_USER_CACHE_WARM
+from . import notifier, runner
+
+# Daemon configuration: comma-separated "job@HH:MM" entries, in local time
+NOTION_BOT_SCHEDULE = os.getenv('NOTION_BOT_SCHEDULE', 'tasks@09:00,recos@09:00')
+
+JOBS = {name: runner.runner_for(name) for name in ('tasks', 'recos', 'all')}
+
+
+class SnowflakeSession:
+    """Keeps one authenticated Snowflake connection open, reconnecting when it expires."""
+
+    def __init__(self):
+        self.conn = None
+
+    def connection(self):
+        if not self.is_alive():
+            self.close()
+            self.conn = get_snowflake_connection(keep_alive=True)
+        return self.conn
+
+    def is_alive(self):
+        import snowflake.connector
+        if self.conn is None or self.conn.is_closed():
+            return False
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except snowflake.connector.errors.Error as e:
+            logging.warning(f"Snowflake session lost: {str(e)}")
+            return False
+
+    def close(self):
+        import snowflake.connector
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except snowflake.connector.errors.Error:
+                pass
+            self.conn = None
+
+
+def parse_schedule(spec):
+    entries = []
+    for entry in spec.split(','):
+        job, at = entry.strip().split('@')
+        if job not in JOBS:
+            raise ValueError(f"Unknown job '{job}' in schedule, expected one of {', '.join(JOBS)}")
+        hour, minute = (int(part) for part in at.split(':'))
+        entries.append((job, hour, minute))
+    return entries
+
+
+def next_run(hour, minute, now):
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+def run_job(session, job):
+    logging.info(f"Running scheduled job '{job}'")
+    if JOBS[job](session.connection()):
+        return
+    # A run can fail because the session expired mid-query: retry once on a fresh one
+    if not session.is_alive():
+        logging.info(f"Retrying job '{job}' on a new Snowflake session")
+        JOBS[job](session.connection())
+
+
+def run_daemon(schedule=NOTION_BOT_SCHEDULE):
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f"Received signal {signum}, shutting down after the current job...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    now = datetime.now()
+    due = {entry: next_run(entry[1], entry[2], now) for entry in parse_schedule(schedule)}
+    session = SnowflakeSession()
+    try:
+        if SLACK_USER_CACHE_WARM:
+            notifier.clients.user_cache.warm()
+        while not stop.is_set():
+            entry, run_at = min(due.items(), key=lambda item: item[1])
+            logging.info(f"Next job '{entry[0]}' at {run_at:%Y-%m-%d %H:%M}")
+            if stop.wait(max(0, (run_at - datetime.now()).total_seconds())):
+                break
+            try:
+                run_job(session, entry[0])
+            except Exception as e:
+                error_message = f"Scheduled job '{entry[0]}' failed: {str(e)}"
+                logging.error(error_message)
+                notifier.report_error(error_message, type(e).__name__)
+                notifier.flush()
+            due[entry] = next_run(entry[1], entry[2], datetime.now())
+    finally:
+        session.close()
+        notifier.close()
+        logging.info("Daemon stopped.")
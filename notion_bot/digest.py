@@ -0,0 +1,77 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from .dispatch import build_blocks
+
+# Digest configuration
+SLACK_DIGEST_MODE = os.getenv('SLACK_DIGEST_MODE', '').lower() in ('1', 'true', 'yes')
+SLACK_MAX_BLOCKS = 50  # Slack rejects messages with more blocks than this
+
+
+class DigestCollector:
+    """Collects planned notifications and sends one message per recipient.
+
+    Each card keeps its own section and "View in Notion" button; recipients
+    with more cards than fit in one message get several numbered pages.
+    """
+
+    def __init__(self):
+        self._notifications = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, email, message, link, on_sent=None, on_failed=None):
+        with self._lock:
+            cards = self._notifications.setdefault(email, OrderedDict())
+            callbacks = cards.setdefault((message, link), ([], []))
+            if on_sent:
+                callbacks[0].append(on_sent)
+            if on_failed:
+                callbacks[1].append(on_failed)
+
+    def flush(self, dispatcher):
+        with self._lock:
+            notifications, self._notifications = self._notifications, OrderedDict()
+
+        messages = 0
+        for email, cards in notifications.items():
+            pages = paginate(cards)
+            for page_number, page in enumerate(pages, start=1):
+                title = f"📋 You have {len(cards)} Notion reminder{'s' if len(cards) > 1 else ''}"
+                if len(pages) > 1:
+                    title += f" ({page_number}/{len(pages)})"
+                blocks = [{"type": "header", "text": {"type": "plain_text", "text": title}}]
+                sent_callbacks, failed_callbacks = [], []
+                for message, link in page:
+                    blocks.extend(build_blocks(message, link))
+                    sent_callbacks.extend(cards[(message, link)][0])
+                    failed_callbacks.extend(cards[(message, link)][1])
+                dispatcher.submit_blocks(email, blocks, title, _chain(sent_callbacks), _chain(failed_callbacks))
+                messages += 1
+        logging.info(f"Digest: {sum(len(cards) for cards in notifications.values())} notifications grouped into {messages} messages for {len(notifications)} recipients.")
+        return messages
+
+
+def _chain(callbacks):
+    if not callbacks:
+        return None
+    def run_all(*args):
+        for callback in callbacks:
+            callback(*args)
+    return run_all
+
+
+def paginate(cards, max_blocks=SLACK_MAX_BLOCKS):
+    # One header block per page, then up to two blocks per card
+    pages = []
+    page, used = [], 1
+    for message, link in cards:
+        size = len(build_blocks(message, link))
+        if page and used + size > max_blocks:
+            pages.append(page)
+            page, used = [], 1
+        page.append((message, link))
+        used += size
+    if page:
+        pages.append(page)
+    return pages
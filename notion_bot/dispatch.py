@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from .metrics import metrics, log_row
+
+# Dispatch configuration
+SLACK_DISPATCH_CONCURRENCY = int(os.getenv('SLACK_DISPATCH_CONCURRENCY', 8))
+SLACK_MAX_RETRIES = int(os.getenv('SLACK_MAX_RETRIES', 5))
+# Multiplier on the limits below, e.g. for workspaces with raised limits or local benchmarks
+SLACK_RATE_LIMIT_SCALE = float(os.getenv('SLACK_RATE_LIMIT_SCALE', 1))
+# Consecutive Slack errors after which delivery stops and remaining messages are written to SLACK_SPILL_PATH
+SLACK_BREAKER_THRESHOLD = int(os.getenv('SLACK_BREAKER_THRESHOLD', 10))
+SLACK_SPILL_PATH = os.getenv('SLACK_SPILL_PATH', 'slack_undelivered.jsonl')
+SLACK_MAX_SECTION_CHARS = 3000  # Slack rejects section blocks with longer text
+
+# Errors about one recipient, which say nothing about Slack's health and do not trip the breaker
+RECIPIENT_ERRORS = {'users_not_found', 'user_not_found', 'channel_not_found', 'cannot_dm_bot', 'user_disabled'}
+
+# Requests per minute allowed for each Slack Web API method we call (tier limits), for the whole workspace
+SLACK_METHOD_LIMITS = {
+    'users.lookupByEmail': 50,  # Tier 3
+    'users.list': 20,           # Tier 2
+    'chat.postMessage': 300,    # Special tier: several hundred per minute across channels
+}
+# chat.postMessage is also limited per channel, to about one message per second to each DM
+SLACK_CHANNEL_POST_LIMIT = 60
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(rate_per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        # Drain the bucket so every caller waits out a Retry-After; concurrent 429s do not add up
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RateLimitedClient:
+    """Wraps a WebClient so every call goes through its method's token bucket and retries 429s.
+
+    Messages also go through a bucket of their channel, so one busy recipient is held to
+    SLACK_CHANNEL_POST_LIMIT without slowing down the DMs to everyone else.
+    """
+
+    def __init__(self, client, limits=SLACK_METHOD_LIMITS, channel_limit=SLACK_CHANNEL_POST_LIMIT, max_retries=SLACK_MAX_RETRIES):
+        self.client = client
+        self.max_retries = max_retries
+        self.buckets = {method: TokenBucket(rate * SLACK_RATE_LIMIT_SCALE) for method, rate in limits.items()}
+        self.channel_rate = channel_limit * SLACK_RATE_LIMIT_SCALE
+        self.channel_buckets = {}
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def users_lookupByEmail(self, **kwargs):
+        return self._call('users.lookupByEmail', self.client.users_lookupByEmail, **kwargs)
+
+    def users_list(self, **kwargs):
+        return self._call('users.list', self.client.users_list, **kwargs)
+
+    def chat_postMessage(self, **kwargs):
+        return self._call('chat.postMessage', self.client.chat_postMessage, self.channel_bucket(kwargs.get('channel')), **kwargs)
+
+    def channel_bucket(self, channel):
+        with self._lock:
+            bucket = self.channel_buckets.get(channel)
+            if bucket is None:
+                bucket = self.channel_buckets[channel] = TokenBucket(self.channel_rate)
+            return bucket
+
+    def _call(self, method, func, channel_bucket=None, **kwargs):
+        # slack_sdk is only loaded once Slack is actually called
+        from slack_sdk.errors import SlackApiError
+        # A 429 on a message is about its channel: only that channel waits out the Retry-After
+        bucket = channel_bucket or self.buckets[method]
+        for attempt in range(self.max_retries + 1):
+            if channel_bucket is not None:
+                channel_bucket.acquire()
+            self.buckets[method].acquire()
+            started = time.perf_counter()
+            try:
+                return func(**kwargs)
+            except SlackApiError as e:
+                if getattr(e.response, 'status_code', None) != 429 or attempt == self.max_retries:
+                    raise
+                metrics.inc('slack_errors_total', method=method, code='ratelimited')
+                retry_after = int(e.response.headers.get('Retry-After', 1))
+                with self._lock:
+                    self.throttled += 1
+                logging.warning(f"Rate limited on {method}, retrying in {retry_after}s")
+                bucket.pause(retry_after)
+            finally:
+                metrics.observe('slack_api_seconds', time.perf_counter() - started, method=method)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; any success resets the count.
+
+    Once open it stays open until `reset`, which the notifier calls at the end of each run.
+    """
+
+    def __init__(self, threshold=SLACK_BREAKER_THRESHOLD):
+        self.threshold = threshold
+        self.failures = 0
+        self.open = False
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        # Returns True only for the failure that opened the breaker
+        with self._lock:
+            self.failures += 1
+            if self.open or self.failures < self.threshold:
+                return False
+            self.open = True
+            return True
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self.open = False
+
+
+class ErrorAggregator:
+    """Collects a run's errors, grouped by code, for one summary to the admin."""
+
+    def __init__(self, samples=3):
+        self.samples = samples
+        self._groups = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, code, message):
+        with self._lock:
+            group = self._groups.setdefault(code, [0, []])
+            group[0] += 1
+            if len(group[1]) < self.samples:
+                group[1].append(message)
+
+    def __len__(self):
+        with self._lock:
+            return sum(count for count, _ in self._groups.values())
+
+    def summary(self, max_chars=SLACK_MAX_SECTION_CHARS):
+        # Returns the grouped report and starts a new collection, or None if nothing failed
+        with self._lock:
+            groups, self._groups = self._groups, OrderedDict()
+        if not groups:
+            return None
+        total = sum(count for count, _ in groups.values())
+        lines = [f"🚨 Notion bot run finished with {total} error(s):"]
+        for code, (count, messages) in sorted(groups.items(), key=lambda item: -item[1][0]):
+            lines.append(f"\n*{code}* × {count}")
+            lines.extend(f"• {message}" for message in messages)
+            if count > len(messages):
+                lines.append(f"• … and {count - len(messages)} more")
+        text = "\n".join(lines)
+        if len(text) > max_chars:
+            text = text[:max_chars - 1] + "…"
+        return text
+
+
+def build_blocks(message, link):
+    blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": message}}]
+    if link:
+        blocks.append({"type": "actions", "elements": [{"type": "button", "text": {"type": "plain_text", "text": "View in Notion"}, "url": link}]})
+    return blocks
+
+
+class Dispatcher:
+    """Delivers Slack DMs from a bounded thread pool.
+
+    Callers only enqueue with `submit`; `drain` blocks until every message has
+    been handled. Failures are collected in `errors` and sent to the admin as
+    one summary by `report_errors`. After too many consecutive Slack errors the
+    breaker opens and remaining messages are appended to `spill_path` instead.
+    """
+
+    def __init__(self, client, user_cache, admin_email, concurrency=SLACK_DISPATCH_CONCURRENCY,
+                 breaker=None, spill_path=SLACK_SPILL_PATH):
+        self.client = client
+        self.user_cache = user_cache
+        self.admin_email = admin_email
+        self.breaker = breaker or CircuitBreaker()
+        self.errors = ErrorAggregator()
+        self.spill_path = spill_path
+        self.sent = 0
+        self.failed = 0
+        self.spilled = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='slack')
+
+    def submit(self, email, message, link, on_sent=None, on_failed=None):
+        self.submit_blocks(email, build_blocks(message, link), message, on_sent, on_failed)
+
+    def submit_blocks(self, email, blocks, text, on_sent=None, on_failed=None):
+        # on_sent() runs once Slack accepted the message, on_failed(code) when it was not delivered
+        future = self._executor.submit(self._deliver, email, blocks, text, on_sent, on_failed)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def drain(self):
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                break
+            wait(pending)
+        logging.info(f"Slack dispatch summary: {self.sent} sent, {self.failed} failed, {self.client.throttled} throttled, {self.spilled} spilled.")
+        return {'sent': self.sent, 'failed': self.failed, 'throttled': self.client.throttled, 'spilled': self.spilled}
+
+    def report_errors(self):
+        # One DM to the admin for the whole run, then a fresh breaker for the next run
+        summary = self.errors.summary()
+        if summary:
+            self.submit(self.admin_email, summary, "")
+            self.drain()
+        self.breaker.reset()
+
+    def shutdown(self):
+        self.drain()
+        self._executor.shutdown()
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _deliver(self, email, blocks, text, on_sent, on_failed):
+        if self.breaker.open:
+            self._spill(email, blocks, text)
+            if on_failed:
+                on_failed('circuit_open')
+            return
+        from slack_sdk.errors import SlackApiError
+        try:
+            with metrics.timer('slack_lookup'):
+                user_id = self.user_cache.lookup(email)
+            if not user_id:
+                self._fail(email, f"Error finding user: users_not_found for email {email}", 'users_not_found', on_failed)
+                return
+            with metrics.timer('slack_post'):
+                response = self.client.chat_postMessage(channel=user_id, text=text, blocks=blocks)
+            if response['ok']:
+                self.breaker.record_success()
+                with self._lock:
+                    self.sent += 1
+                log_row("Message sent", email, email=email)
+                if on_sent:
+                    on_sent()
+            else:
+                self._fail(email, f"Error sending message to {email}: {response['error']}", response['error'], on_failed)
+        except SlackApiError as e:
+            self._fail(email, f"Error sending message to {email}: {e.response['error']}", e.response['error'], on_failed)
+        except Exception as e:
+            self._fail(email, f"Error sending message to {email}: {str(e)}", type(e).__name__, on_failed)
+
+    def _fail(self, email, error_message, code, on_failed=None):
+        with self._lock:
+            self.failed += 1
+        metrics.inc('delivery_errors_total', code=code)
+        logging.error(error_message)
+        if code not in RECIPIENT_ERRORS and self.breaker.record_failure():
+            logging.error(f"{self.breaker.threshold} consecutive Slack errors, stopping delivery for this run. "
+                          f"Remaining messages are written to {self.spill_path}.")
+            self.errors.add('circuit_open', f"Delivery stopped after {self.breaker.threshold} consecutive Slack errors, "
+                                            f"remaining messages were written to {self.spill_path}")
+        # Never report the admin's own DM, so a failing summary cannot loop
+        if email != self.admin_email:
+            self.errors.add(code, error_message)
+        if on_failed:
+            on_failed(code)
+
+    def _spill(self, email, blocks, text):
+        record = {'email': email, 'text': text, 'blocks': blocks, 'spilled_at': datetime.now().isoformat()}
+        with self._lock:
+            with open(self.spill_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self.spilled += 1
+        metrics.inc('spilled_total')
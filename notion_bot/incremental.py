@@ -0,0 +1,71 @@
+import os
+import logging
+import uuid
+from datetime import date, datetime, timedelta
+from .request import build_changes_query, stream_rows, NOTION_WATERMARK_COLUMN
+
+# Incremental mode configuration
+NOTION_BOT_INCREMENTAL = os.getenv('NOTION_BOT_INCREMENTAL', '').lower() in ('1', 'true', 'yes')
+NOTION_FULL_REFRESH_DAYS = int(os.getenv('NOTION_FULL_REFRESH_DAYS', 7))
+NOTION_WATERMARK_OVERLAP_MINUTES = int(os.getenv('NOTION_WATERMARK_OVERLAP_MINUTES', 10))
+# Columns computed upstream as day counters (e.g. LEAD_TIME); they keep counting in the snapshot
+NOTION_DAILY_COUNTERS = [column for column in os.getenv('NOTION_DAILY_COUNTERS', 'LEAD_TIME').split(',') if column]
+MERGE_BATCH_SIZE = 1000
+
+
+def sync_snapshot(conn, state, job, table, columns, key, keep=None, now=None, shard=None):
+    """Brings the local snapshot of `table` up to date and returns its rows.
+
+    Only rows whose watermark column moved since the last run are fetched. A
+    full read is done on the first run and every NOTION_FULL_REFRESH_DAYS, which
+    is also when cards deleted upstream disappear from the snapshot. Rows that
+    `keep` rejects (e.g. a status that never reminds) are removed rather than stored.
+    A sharded run only reads its own partition, and keeps it under its own `job` key.
+    """
+    now = now or datetime.now()
+    watermark, full_refresh_at = state.sync_status(job)
+    full = watermark is None or now - full_refresh_at >= timedelta(days=NOTION_FULL_REFRESH_DAYS)
+    since = None
+    if not full:
+        # Re-read a small overlap so rows committed late with an older timestamp are not missed
+        since = datetime.fromisoformat(watermark) - timedelta(minutes=NOTION_WATERMARK_OVERLAP_MINUTES)
+
+    logging.info(f"Syncing '{job}' snapshot ({'full refresh' if full else f'changes since {since}'})...")
+    query, params = build_changes_query(table, columns, since, shard=shard, key=key)
+    sync_id = uuid.uuid4().hex
+    upserts, deletes = [], []
+    changed = 0
+    for row in stream_rows(conn, query, params, f"changed {job}"):
+        changed += 1
+        edited = row.pop(NOTION_WATERMARK_COLUMN, None)
+        if edited is not None:
+            edited = edited.isoformat() if hasattr(edited, 'isoformat') else str(edited)
+            if watermark is None or edited > watermark:
+                watermark = edited
+        if keep is None or keep(row):
+            row['_SYNCED_ON'] = now.date().isoformat()
+            upserts.append((row[key], row))
+        else:
+            deletes.append(row[key])
+        if len(upserts) + len(deletes) >= MERGE_BATCH_SIZE:
+            state.merge_snapshot(job, sync_id, upserts, deletes)
+            upserts, deletes = [], []
+    state.merge_snapshot(job, sync_id, upserts, deletes)
+
+    if full:
+        state.sweep_snapshot(job, sync_id)
+        full_refresh_at = now
+    state.save_sync(job, watermark, full_refresh_at)
+    logging.info(f"Snapshot '{job}' merged {changed} changed rows, watermark is now {watermark}.")
+    return age_rows(state.iter_snapshot(job), now.date())
+
+
+def age_rows(rows, today):
+    # A card that did not change since it was synced still moved on by one day per day
+    for row in rows:
+        elapsed = (today - date.fromisoformat(row.pop('_SYNCED_ON'))).days
+        if elapsed:
+            for column in NOTION_DAILY_COUNTERS:
+                if row.get(column) is not None:
+                    row[column] += elapsed
+        yield row
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import zlib
+import random
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Metrics configuration
+NOTION_BOT_METRICS_PATH = os.getenv('NOTION_BOT_METRICS_PATH', '')  # *.prom: Prometheus textfile, otherwise JSON
+# Per-row logs: "text" lines or "structured" JSON objects, keeping NOTION_BOT_LOG_SAMPLE of the cards (0 to 1)
+NOTION_BOT_LOG_MODE = os.getenv('NOTION_BOT_LOG_MODE', 'text')
+NOTION_BOT_LOG_SAMPLE = float(os.getenv('NOTION_BOT_LOG_SAMPLE', 1))
+
+# Upper bounds (seconds) of the Slack API latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """In-process counters, stage timers and latency histograms.
+
+    - timer(stage): seconds spent per stage (connect, query, fetch, decision, slack_lookup, slack_post),
+      summed across threads
+    - observe(name, seconds, **labels): histogram, e.g. Slack API latency by method
+    - inc(name, **labels): counters, e.g. rules fired or errors by code
+
+    Values are cumulative for the life of the process, so a daemon exports monotonic counters.
+    `labels` are added to every exported series, e.g. the shard of a sharded run.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, path=NOTION_BOT_METRICS_PATH):
+        self.buckets = buckets
+        self.path = path
+        self.labels = {}
+        self.started = time.time()
+        self._counters = defaultdict(int)
+        self._timers = defaultdict(lambda: [0, 0.0])
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        return _Timer(self, stage)
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            timer = self._timers[stage]
+            timer[0] += 1
+            timer[1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # One count per bucket plus +Inf, then the running sum
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bisect_left(self.buckets, value)] += 1
+            histogram[-1] += value
+
+    def reset(self):
+        # Start over, e.g. when a worker process moves on to another shard
+        with self._lock:
+            self.started = time.time()
+            self._counters.clear()
+            self._timers.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {stage: tuple(timer) for stage, timer in self._timers.items()}
+            histograms = {key: list(histogram) for key, histogram in self._histograms.items()}
+        return {
+            'labels': dict(self.labels),
+            'started': self.started,
+            'exported': time.time(),
+            'stages': {stage: {'count': count, 'seconds': round(seconds, 6)} for stage, (count, seconds) in sorted(timers.items())},
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(counters.items())],
+            'histograms': [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], _cumulative(histogram[:-1]))),
+                    'count': sum(histogram[:-1]),
+                    'sum': round(histogram[-1], 6),
+                }
+                for (name, labels), histogram in sorted(histograms.items())
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='notion_bot'):
+        summary = self.snapshot()
+        common = summary['labels']
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(f'{prefix}_stage_seconds_total{_labels({**common, "stage": stage})} {timer["seconds"]}' for stage, timer in summary['stages'].items()),
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(f'{prefix}_stage_calls_total{_labels({**common, "stage": stage})} {timer["count"]}' for stage, timer in summary['stages'].items()),
+        ]
+        typed = set()
+        for counter in summary['counters']:
+            name = f"{prefix}_{counter['name']}"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels({**common, **counter['labels']})} {counter['value']}")
+        for histogram in summary['histograms']:
+            name = f"{prefix}_{histogram['name']}"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            labels = {**common, **histogram['labels']}
+            for bound, count in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+        lines.append(f"{prefix}_last_export_timestamp_seconds{_labels(common)} {summary['exported']:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        # Write then rename, so a textfile collector never reads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        logging.info(f"Metrics exported to {path}.")
+
+
+def _cumulative(counts):
+    total = 0
+    for count in counts:
+        total += count
+        yield total
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def sampled(key=None, rate=NOTION_BOT_LOG_SAMPLE):
+    # The same card is always in or out of the sample, so all of its log lines stay together
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    if key is None:
+        return random.random() < rate
+    return zlib.crc32(str(key).encode()) % 10000 < rate * 10000
+
+
+def log_row(event, key=None, **fields):
+    # Per-row diagnostics, sampled by card and skipped entirely when INFO is disabled
+    if not sampled(key) or not logging.getLogger().isEnabledFor(logging.INFO):
+        return
+    if NOTION_BOT_LOG_MODE == 'structured':
+        logging.info(json.dumps({'event': event, 'key': key, **fields}, default=str))
+    else:
+        logging.info(f"{event}: {', '.join(f'{name}={value}' for name, value in fields.items())}")
+
+
+metrics = Metrics()
@@ -0,0 +1,114 @@
+import os
+import time
+import logging
+from datetime import datetime
+from .clients import Clients
+from .digest import SLACK_DIGEST_MODE
+from .dispatch import RECIPIENT_ERRORS
+from .metrics import metrics
+
+# Slack side shared by the task and recommendation jobs: one client, user cache, pool and ledger,
+# built on first use
+clients = Clients()
+# How long a flush keeps retrying failed deliveries before leaving them to the next run
+NOTION_OUTBOX_RETRY_WINDOW = int(os.getenv('NOTION_OUTBOX_RETRY_WINDOW', 120))
+
+# Dry runs (planner.py) set a sink that receives each message instead of Slack
+sink = None
+# False once something was queued or reported since the last flush, so close() does not flush twice
+flushed = True
+
+def notify(job, day, email, message, link, card_id=None, rule=None):
+    # Card notifications are written to the outbox first, so a failed delivery is retried rather than lost
+    if card_id is None:
+        deliver(email, message, link)
+        return
+    if clients.state.already_sent(card_id, email, rule, day):
+        logging.info(f"Already sent '{rule}' for {card_id} to {email} today, skipping")
+        metrics.inc('notifications_total', job=job, outcome='already_sent')
+        return
+    if not clients.state.enqueue(job, day, card_id, email, rule, message, link):
+        # Left over from an earlier attempt: the outbox retries it on its own schedule
+        metrics.inc('notifications_total', job=job, outcome='already_queued')
+        return
+    metrics.inc('notifications_total', job=job, outcome='queued')
+    deliver(email, message, link, (card_id, email, rule, day))
+
+def deliver(email, message, link, key=None):
+    global flushed
+    if sink is not None:
+        sink(email, message, link, key)
+        return
+    flushed = False
+    on_sent = on_failed = None
+    if key is not None:
+        on_sent = lambda: clients.state.record_sent(*key)
+        on_failed = lambda code: record_failure(key, code)
+    if SLACK_DIGEST_MODE:
+        clients.digest.add(email, message, link, on_sent, on_failed)
+    else:
+        clients.dispatcher.submit(email, message, link, on_sent, on_failed)
+
+def record_failure(key, code):
+    # Recipient errors are not retried: the user cache keeps the miss for SLACK_USER_CACHE_NEGATIVE_TTL,
+    # so every attempt would fail again. The admin summary reports the address once.
+    if code in RECIPIENT_ERRORS:
+        clients.state.discard(*key)
+        metrics.inc('outbox_discarded_total', code=code)
+    else:
+        clients.state.record_failure(*key, code)
+
+def retry_outbox(window=NOTION_OUTBOX_RETRY_WINDOW):
+    # Deliver due outbox entries (failed attempts and leftovers of earlier runs), waiting for
+    # backoffs that end within the window; later ones are left to the next run
+    for card_id, recipient, rule, attempts, last_error in clients.state.expire():
+        logging.warning(f"Dropping expired notification '{rule}' for {card_id} to {recipient} after {attempts} attempts ({last_error})")
+        metrics.inc('outbox_expired_total')
+    deadline = time.monotonic() + window
+    while not clients.dispatcher.breaker.open:
+        due = clients.state.due()
+        if due:
+            logging.info(f"Retrying {len(due)} notifications from the outbox.")
+            metrics.inc('outbox_retries_total', len(due))
+            for card_id, recipient, rule, day, message, link in due:
+                deliver(recipient, message, link, (card_id, recipient, rule, day))
+            if SLACK_DIGEST_MODE:
+                clients.digest.flush(clients.dispatcher)
+            clients.dispatcher.drain()
+            continue
+        next_attempt = clients.state.next_attempt()
+        if next_attempt is None:
+            break
+        delay = max(0, (next_attempt - datetime.now()).total_seconds())
+        if time.monotonic() + delay > deadline:
+            logging.info(f"Next outbox retry at {next_attempt:%Y-%m-%d %H:%M:%S}, leaving it to the next run.")
+            break
+        time.sleep(delay)
+
+def flush():
+    # Send collected digests, wait until every queued message has been handled, retry what failed,
+    # then report errors and export the run's metrics
+    global flushed
+    if SLACK_DIGEST_MODE:
+        clients.digest.flush(clients.dispatcher)
+    clients.dispatcher.drain()
+    retry_outbox()
+    summary = clients.dispatcher.drain()
+    clients.dispatcher.report_errors()
+    metrics.export()
+    flushed = True
+    return summary
+
+def report_error(message, code='error'):
+    # Collected with delivery failures and sent to the admin as one summary when the run is flushed
+    global flushed
+    flushed = False
+    clients.dispatcher.errors.add(code, message)
+
+def close():
+    # Deliver what is left if anything was queued since the last flush, then release the clients
+    if not flushed and (clients.built('dispatcher') or clients.built('digest')):
+        flush()
+    if clients.built('user_cache'):
+        logging.info(f"Slack user cache: {clients.user_cache.hits} hits, {clients.user_cache.lookups} lookups.")
+    clients.close()
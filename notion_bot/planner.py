@@ -0,0 +1,136 @@
+import sys
+import gzip
+import json
+import logging
+import argparse
+import cProfile
+import pstats
+from contextlib import nullcontext
+from datetime import date
+from .request import get_snowflake_connection, TASKS_TABLE, TASK_COLUMNS, RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS
+from .incremental import age_rows
+from .state import json_default
+from . import notifier, runner
+
+# Dry runs: the jobs' full decision logic with a fixed "today", writing the notifications they would
+# send as JSONL instead of calling Slack. Rows come from Snowflake or from a recorded snapshot.
+#   notion-bot record --job tasks --out tasks.jsonl.gz
+#   notion-bot plan --today 2024-06-03 --replay tasks.jsonl.gz --out plan.jsonl
+
+SOURCES = {
+    'tasks': (TASKS_TABLE, TASK_COLUMNS),
+    'recos': (RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS),
+}
+
+
+def _open(path, mode):
+    if path == '-':
+        return nullcontext(sys.stdout if 'w' in mode else sys.stdin)
+    return gzip.open(path, mode + 't') if path.endswith('.gz') else open(path, mode)
+
+
+def record(conn, job, path, batch_size=1000):
+    """Saves a job's table as a snapshot: a header line, then one JSON array per row.
+
+    Rows are read without the pushed-down reminder filter, so the snapshot can be
+    planned for any day.
+    """
+    table, columns = SOURCES[job]
+    count = 0
+    with _open(path, 'w') as f, conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        header = {'job': job, 'table': table, 'recorded_on': date.today().isoformat(), 'columns': columns}
+        f.write(json.dumps(header) + "\n")
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                f.write(json.dumps(row, default=json_default, ensure_ascii=False) + "\n")
+            count += len(batch)
+    logging.info(f"Recorded {count} {job} rows to {path}.")
+    return count
+
+
+def read_snapshot(path):
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline())
+    return header
+
+
+def replay(path, today):
+    # Yields the snapshot's rows as dicts; day counters move on by the days since it was recorded
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline())
+        columns, recorded_on = header['columns'], header['recorded_on']
+        rows = (dict(zip(columns, json.loads(line)), _SYNCED_ON=recorded_on) for line in f)
+        yield from age_rows(rows, today)
+
+
+def plan(jobs, today, out, snapshots=None, conn=None):
+    """Runs each job's decision logic for `today` and writes one JSON object per planned message.
+
+    The state store is used through an in-memory copy, so the ledger and overdue
+    history shape the plan but nothing is written back.
+    """
+    snapshots = snapshots or {}
+    planned = 0
+    with _open(out, 'w') as f, notifier.clients.state.scratch():
+        for name in jobs:
+            job = runner.JOBS[name]
+
+            def sink(email, message, link, key, job_name=name):
+                nonlocal planned
+                card_id, _, rule, _ = key or (None, None, None, None)
+                entry = {'job': job_name, 'day': today.isoformat(), 'recipient': email, 'rule': rule,
+                         'card_id': card_id, 'message': message, 'link': link}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                planned += 1
+
+            job.run_day = today
+            notifier.sink = sink
+            try:
+                rows = map(job.RECORD.from_dict, replay(snapshots[name], today)) if name in snapshots else job.fetch_rows(conn)
+                count = job.process_rows(rows)
+            finally:
+                notifier.sink = None
+            logging.info(f"Planned job '{name}' for {today} over {count} rows.")
+    logging.info(f"{planned} notifications planned.")
+    return planned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='notion-bot', description="Plan runs without Slack, and record or replay Snowflake results.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help="save a job's table to a JSONL snapshot")
+    record_parser.add_argument('--job', choices=SOURCES, required=True)
+    record_parser.add_argument('--out', required=True, help="snapshot path, gzipped if it ends with .gz")
+    plan_parser = commands.add_parser('plan', help="write the notifications a run would send as JSONL")
+    plan_parser.add_argument('--job', choices=('tasks', 'recos', 'all'), default='all')
+    plan_parser.add_argument('--today', type=date.fromisoformat, default=date.today(), help="day to plan for (YYYY-MM-DD)")
+    plan_parser.add_argument('--replay', action='append', default=[], metavar='SNAPSHOT', help="read a job's rows from a snapshot instead of Snowflake")
+    plan_parser.add_argument('--out', default='-', help="plan path (default: stdout)")
+    plan_parser.add_argument('--profile', action='store_true', help="print the 25 most expensive calls")
+    args = parser.parse_args(argv)
+
+    conn = None
+    try:
+        if args.command == 'record':
+            conn = get_snowflake_connection()
+            record(conn, args.job, args.out)
+            return
+        jobs = list(SOURCES) if args.job == 'all' else [args.job]
+        snapshots = {read_snapshot(path)['job']: path for path in args.replay}
+        if any(name not in snapshots for name in jobs):
+            conn = get_snowflake_connection()
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler:
+            profiler.enable()
+        plan(jobs, args.today, args.out, snapshots, conn)
+        if profiler:
+            profiler.disable()
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+    finally:
+        if conn:
+            conn.close()
+        notifier.close()
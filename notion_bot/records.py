@@ -0,0 +1,69 @@
+from operator import itemgetter
+from .rules import REVIEWER_VALIDATIONS, to_date
+
+# Only the columns the bot reads, in the order the records take them
+TASK_COLUMNS = ['ID', 'REQUEST', 'STATUS', 'LINK', 'LEAD_TIME', 'SLA_PUT_ON_HOLD_ON', 'MAIL'] + [
+    column for validation in REVIEWER_VALIDATIONS for column in validation
+]
+RECOMMENDATION_COLUMNS = ['RECO', 'CONDITION', 'OWNER_RECO', 'CREATOR_RECO', 'FORMATTED_INITIAL_ETA', 'FORMATTED_ETA_POSTPONED']
+
+
+class _Record:
+    __slots__ = ()
+    COLUMNS = []
+
+    @classmethod
+    def from_dict(cls, row):
+        # For rows that are not cursor tuples: snapshots, replays and pandas batches
+        return cls(*[row.get(column) for column in cls.COLUMNS])
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TaskCard(_Record):
+    """A card of the tasks table, holding the columns the rules read.
+
+    SLA_PUT_ON_HOLD_ON is parsed once, when the record is built. `validations` keeps the
+    final validation and reviewer email columns as read, in REVIEWER_VALIDATIONS order.
+    """
+
+    __slots__ = ('id', 'request', 'status', 'link', 'lead_time', 'sla_date', 'mail', 'validations')
+    COLUMNS = TASK_COLUMNS
+
+    def __init__(self, id, request, status, link, lead_time, sla_put_on_hold_on, mail, *validations):
+        self.id = id
+        self.request = request
+        self.status = status
+        self.link = link
+        self.lead_time = lead_time
+        self.sla_date = to_date(sla_put_on_hold_on)
+        self.mail = mail
+        self.validations = validations
+
+
+class Recommendation(_Record):
+    """A recommendation card; the ETA (postponed, or else initial) is parsed when the record is built."""
+
+    __slots__ = ('reco', 'condition', 'owner_reco', 'creator_reco', 'eta_date')
+    COLUMNS = RECOMMENDATION_COLUMNS
+
+    def __init__(self, reco, condition, owner_reco, creator_reco, formatted_initial_eta, formatted_eta_postponed):
+        self.reco = reco
+        self.condition = condition
+        self.owner_reco = owner_reco
+        self.creator_reco = creator_reco
+        self.eta_date = to_date(formatted_eta_postponed or formatted_initial_eta, "%d/%m/%Y")
+
+
+def reader(record_type, columns):
+    """Returns a function building `record_type` records from cursor tuples laid out as `columns`.
+
+    Column positions are resolved once per query; columns the result set lacks read as None.
+    """
+    positions = {column: position for position, column in enumerate(columns)}
+    wanted = [positions.get(column) for column in record_type.COLUMNS]
+    if None in wanted:
+        return lambda row: record_type(*[None if position is None else row[position] for position in wanted])
+    pick = itemgetter(*wanted)
+    return lambda row: record_type(*pick(row))
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from .request import NOTION_BOT_BATCH_MODE, iter_query_recommandation, RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS
+from .records import Recommendation
+from .incremental import sync_snapshot, NOTION_BOT_INCREMENTAL
+from .rules import evaluate_recommendation
+from .shards import job_key
+from .metrics import metrics, log_row
+from .notifier import clients, notify
+
+TEST_MODE = False  
+TEST_EMAIL = 'test@example.com'  # Anonymized test email
+POC_team = 'poc_username'  # Anonymized POC team username
+
+JOB = 'recos'
+RECORD = Recommendation
+run_day = date.today()
+run_shard = None  # both set by runner.run; a shard for sharded runs, see shards.py
+
+def run_time():
+    # The run's day at the current time of day, so a plan for another day ages the snapshot to that day
+    return datetime.combine(run_day, datetime.now().time())
+
+def send_to_slack(email, message, link, card_id=None, rule=None):
+    if TEST_MODE:
+        email = TEST_EMAIL
+    notify(JOB, run_day, email, message, link, card_id, rule)
+
+def process_recommendation(reco):
+    card_id = reco.reco
+    log_row("Processing recommendation", card_id, CONDITION=reco.condition)
+    
+    with metrics.timer('decision'):
+        rules, notifications = evaluate_recommendation(reco, run_day, POC_team)
+    if not rules:
+        log_row("No action needed", card_id, RECO=card_id)
+        return
+    
+    log_row("Rules fired", card_id, rules=', '.join(rule.name for rule in rules))
+    for rule in rules:
+        metrics.inc('rules_fired_total', job=JOB, rule=rule.name)
+    for notification in notifications:
+        send_to_slack(*notification)
+
+def fetch_rows(conn):
+    # Yields the recommendations to evaluate as Recommendation records
+    if NOTION_BOT_INCREMENTAL:
+        # Fetch only changed cards, then evaluate date-driven reminders on the local snapshot
+        return map(Recommendation.from_dict, sync_snapshot(conn, clients.state, job_key(JOB, run_shard), RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS, 'RECO', now=run_time(), shard=run_shard))
+    if NOTION_BOT_BATCH_MODE:
+        # pandas/NumPy are only needed for large backfills, so import them on demand
+        from .batch import iter_recommendation_rows
+        return iter_recommendation_rows(conn, run_day, shard=run_shard)
+    return iter_query_recommandation(conn, run_day, shard=run_shard)
+
+def process_rows(recos):
+    count = 0
+    for reco in recos:
+        process_recommendation(reco)
+        count += 1
+    return count
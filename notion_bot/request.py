@@ -0,0 +1,246 @@
+import os
+import logging
+from datetime import date
+from .rules import TASK_INDEX, RECO_INDEX
+from .records import TaskCard, Recommendation, TASK_COLUMNS, RECOMMENDATION_COLUMNS, reader
+from .metrics import metrics
+
+# Snowflake Configuration
+SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")
+SNOWFLAKE_PASSWORD = os.getenv("SNOWFLAKE_PASSWORD")
+SNOWFLAKE_ACCOUNT = 'xxx'
+SNOWFLAKE_DATABASE = 'RAW'
+SNOWFLAKE_WAREHOUSE = os.getenv("SNOWFLAKE_WAREHOUSE")
+SNOWFLAKE_ROLE = os.getenv("SNOWFLAKE_ROLE")
+SNOWFLAKE_SCHEMA = os.getenv("SNOWFLAKE_SCHEMA")
+# Key-pair authentication for headless runs (daemon, cron); falls back to the browser login
+SNOWFLAKE_PRIVATE_KEY_PATH = os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH")
+SNOWFLAKE_PRIVATE_KEY_PASSPHRASE = os.getenv("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE")
+
+def load_private_key(path=SNOWFLAKE_PRIVATE_KEY_PATH, passphrase=SNOWFLAKE_PRIVATE_KEY_PASSPHRASE):
+    # The connector expects the private key as unencrypted DER bytes
+    from cryptography.hazmat.primitives import serialization
+    with open(path, "rb") as key_file:
+        private_key = serialization.load_pem_private_key(
+            key_file.read(),
+            password=passphrase.encode() if passphrase else None
+        )
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+def get_snowflake_connection(keep_alive=False):
+    # The connector takes a while to import, so only commands that connect pay for it
+    import snowflake.connector
+    logging.info("Establishing connection to Snowflake...")
+    if SNOWFLAKE_PRIVATE_KEY_PATH:
+        auth = {'private_key': load_private_key()}
+    else:
+        auth = {'password': SNOWFLAKE_PASSWORD, 'authenticator': 'externalbrowser'}
+    # Establishing a connection to Snowflake using environment variables and other configuration details
+    with metrics.timer('connect'):
+        return snowflake.connector.connect(
+            user=SNOWFLAKE_USER,
+            account=SNOWFLAKE_ACCOUNT,
+            warehouse=SNOWFLAKE_WAREHOUSE,
+            database=SNOWFLAKE_DATABASE,
+            schema=SNOWFLAKE_SCHEMA,
+            role=SNOWFLAKE_ROLE,
+            client_session_keep_alive=keep_alive,
+            **auth
+        )
+
+SNOWFLAKE_FETCH_BATCH_SIZE = int(os.getenv("SNOWFLAKE_FETCH_BATCH_SIZE", 1000))
+# Filter rows in Snowflake with the reminder rules instead of fetching whole tables
+SNOWFLAKE_PUSHDOWN = os.getenv("SNOWFLAKE_PUSHDOWN", "1").lower() not in ("0", "false", "no")
+# Evaluate whole fetched batches with pandas/NumPy first, see batch.py
+NOTION_BOT_BATCH_MODE = os.getenv("NOTION_BOT_BATCH_MODE", "").lower() in ("1", "true", "yes")
+
+TASKS_TABLE = 'notion_table'
+RECOMMENDATIONS_TABLE = 'notion'
+
+# SQL for the facts the rules in rules.py are evaluated on. Dates are read like rules.to_date does:
+# the first 10 characters of an ISO date or timestamp, and an empty or malformed value is no date
+# (TRY_TO_DATE gives NULL) rather than an error that fails the whole query.
+SLA_DATE_SQL = "TRY_TO_DATE(LEFT(TO_VARCHAR(SLA_PUT_ON_HOLD_ON), 10), 'YYYY-MM-DD')"
+ETA_DATE_SQL = "TRY_TO_DATE(COALESCE(NULLIF(FORMATTED_ETA_POSTPONED, ''), FORMATTED_INITIAL_ETA), 'DD/MM/YYYY')"
+FIELD_SQL = {
+    'lead_time': "LEAD_TIME",
+    'days_since_sla': f"DATEDIFF(day, {SLA_DATE_SQL}, %(today)s)",
+    'days_until_eta': f"DATEDIFF(day, %(today)s, {ETA_DATE_SQL})",
+    'days_late': f"DATEDIFF(day, {ETA_DATE_SQL}, %(today)s)",
+}
+FACT_SQL = {
+    # fact: (SQL when truthy, SQL when falsy)
+    'sla': (f"{SLA_DATE_SQL} IS NOT NULL", f"{SLA_DATE_SQL} IS NULL"),
+    'creator': ("MAIL <> ''", "(MAIL IS NULL OR MAIL = '')"),
+    'owner': ("OWNER_RECO <> ''", "(OWNER_RECO IS NULL OR OWNER_RECO = '')"),
+}
+
+def rule_predicate(rule):
+    predicates = [FACT_SQL[fact][0 if expected else 1] for fact, expected in rule.requires]
+    if rule.cadence is not None:
+        predicates.append(f"({rule.cadence.sql(FIELD_SQL[rule.cadence.field])})")
+    return " AND ".join(predicates) or "TRUE"
+
+def build_where(index):
+    # A row is fetched only if at least one rule can fire on it today
+    params = {}
+    clauses = []
+    statuses = index.statuses()
+    for i, status in enumerate(statuses):
+        params[f'status_{i}'] = status
+        predicates = "\n        OR ".join(f"({rule_predicate(rule)})" for rule in index.rules_for(status))
+        clauses.append(f"(STATUS = %(status_{i})s AND (\n        {predicates}))")
+    if not statuses:
+        clauses = [f"({rule_predicate(rule)})" for rule in index.rules]
+    return "\n    OR ".join(clauses), params
+
+def shard_predicate(shard, key):
+    # Hash partition of the cards: shard k of N keeps the rows whose key hashes to k modulo N
+    return f"MOD(ABS(HASH({key})), {int(shard.count)}) = {int(shard.index)}"
+
+def build_tasks_query(pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    # Query to be executed on the Snowflake database, with its bind parameters
+    if not pushdown:
+        query = f"SELECT * FROM {TASKS_TABLE}"
+        return (f"{query} WHERE {shard_predicate(shard, 'ID')}" if shard else query), {}
+    where, params = build_where(TASK_INDEX)
+    if shard:
+        where = f"{shard_predicate(shard, 'ID')}\n    AND ({where})"
+    query = f"""
+SELECT
+    {", ".join(TASK_COLUMNS)}
+FROM
+    {TASKS_TABLE}
+WHERE
+    {where}
+    """
+    return query, params
+
+def build_recommendations_query(pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    # Query for fetching recommendations from the Snowflake database, with its bind parameters
+    if not pushdown:
+        query = f"SELECT * FROM {RECOMMENDATIONS_TABLE}"
+        return (f"{query} WHERE {shard_predicate(shard, 'RECO')}" if shard else query), {}
+    where, params = build_where(RECO_INDEX)
+    if shard:
+        where = f"{shard_predicate(shard, 'RECO')}\n    AND ({where})"
+    query = f"""
+SELECT
+    {", ".join(RECOMMENDATION_COLUMNS)}
+FROM
+    {RECOMMENDATIONS_TABLE}
+WHERE
+    {where}
+    """
+    return query, params
+
+# Incremental fetch: only rows edited since the last run, tracked with a high-water mark
+NOTION_WATERMARK_COLUMN = os.getenv("NOTION_WATERMARK_COLUMN", "LAST_EDITED_TIME")
+
+def build_changes_query(table, columns, since=None, watermark_column=NOTION_WATERMARK_COLUMN, shard=None, key=None):
+    # Without a watermark this is a full (projected) read that seeds the snapshot
+    query = f"""
+SELECT
+    {", ".join(columns + [watermark_column])}
+FROM
+    {table}
+    """
+    predicates, params = [], {}
+    if shard:
+        predicates.append(shard_predicate(shard, key))
+    if since is not None:
+        predicates.append(f"{watermark_column} >= %(since)s")
+        params['since'] = since
+    if not predicates:
+        return query, params
+    return query + f"WHERE {' AND '.join(predicates)}\n", params
+
+def stream_rows(conn, query, params=None, label="rows", batch_size=SNOWFLAKE_FETCH_BATCH_SIZE, record_type=None):
+    # Yield rows while the result set is still being fetched, batch_size rows at a time:
+    # as `record_type` records (see records.py) if given, else as dicts
+    with conn.cursor() as cur:
+        with metrics.timer('query'):
+            cur.execute(query, params)
+        columns = [col[0] for col in cur.description]
+        build = reader(record_type, columns) if record_type else lambda row: dict(zip(columns, row))
+        count = 0
+        while True:
+            with metrics.timer('fetch'):
+                batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            count += len(batch)
+            yield from map(build, batch)
+    logging.info(f"Query stream finished. Retrieved {count} {label}.")
+
+def iter_query(conn, today=None, batch_size=SNOWFLAKE_FETCH_BATCH_SIZE, pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    logging.info("Executing Snowflake query...")
+    query, params = build_tasks_query(pushdown, shard)
+    if pushdown:
+        params['today'] = today or date.today()
+    return stream_rows(conn, query, params, "rows", batch_size, TaskCard)
+
+def iter_query_recommandation(conn, today=None, batch_size=SNOWFLAKE_FETCH_BATCH_SIZE, pushdown=SNOWFLAKE_PUSHDOWN, shard=None):
+    logging.info("Executing Snowflake query for recommendations...")
+    query, params = build_recommendations_query(pushdown, shard)
+    if pushdown:
+        params['today'] = today or date.today()
+    return stream_rows(conn, query, params, "recommendations", batch_size, Recommendation)
+
+def execute_query(conn):
+    results = list(iter_query(conn))
+    logging.info(f"Query executed. Retrieved {len(results)} rows.")
+    return results
+
+def execute_query_recommandation(conn):
+    results = list(iter_query_recommandation(conn))
+    logging.info(f"Query executed. Retrieved {len(results)} recommendations.")
+    
+    # Log the first few results for debugging
+    for i, result in enumerate(results[:5]):
+        logging.debug(f"Sample result {i+1}: {result}")
+    
+    return results
+
+def main():
+    # Prints the first rows of both queries to check the Snowflake setup; returns False if they fail
+    ok = False
+    conn = None
+    try:
+        # Establishing the Snowflake connection
+        conn = get_snowflake_connection()
+        # Executing the main query
+        results = execute_query(conn)
+        logging.info(f"Total rows retrieved: {len(results)}")
+        
+        # Display the first 5 rows for verification
+        for i, row in enumerate(results[:5]):
+            logging.info(f"Row {i+1}:")
+            for key, value in row._asdict().items():
+                logging.info(f"  {key}: {value}")
+            logging.info("---")
+        
+        # Execute the recommendation query
+        reco_results = execute_query_recommandation(conn)
+        logging.info(f"Total recommendations retrieved: {len(reco_results)}")
+        
+        # Display the first 5 recommendations for verification
+        for i, row in enumerate(reco_results[:5]):
+            logging.info(f"Recommendation {i+1}:")
+            for key, value in row._asdict().items():
+                logging.info(f"  {key}: {value}")
+            logging.info("---")
+        ok = True
+        
+    except Exception as e:
+        logging.error(f"An error occurred: {str(e)}")
+    finally:
+        # Ensure the Snowflake connection is closed
+        if conn:
+            conn.close()
+            logging.info("Snowflake connection closed.")
+    return ok
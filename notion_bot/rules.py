@@ -0,0 +1,248 @@
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+
+# Card statuses that can trigger a reminder
+STATUS_REVIEWERS_ON_IT = '💪 Reviewers on it'
+STATUS_ON_HOLD = '😴 On Hold'
+STATUS_PENDING_INFO = '⏳ Pending more information'
+
+REVIEWER_VALIDATIONS = [
+    ('REGULATORY_FINAL_VALIDATION', 'REGULATORY_REVIEWER_EMAIL'),
+    ('FC_FINAL_VALIDATION', 'FINANCIAL_CRIME_REVIEWER_EMAIL'),
+    ('SECURITY_FINAL_VALIDATION', 'SECURITY_REVIEWER_EMAIL'),
+    ('FINANCE_FINAL_VALIDATION', 'FINANCE_REVIEWER_EMAIL'),
+    ('LEGAL_FINAL_VALIDATION', 'LEGAL_REVIEWER_EMAIL'),
+    ('RISK_FINAL_VALIDATION', 'RISK_REVIEWER_EMAIL'),
+    ('IC_FINAL_VALIDATION', 'INTERNAL_CONTROL_REVIEWER_EMAIL')
+]
+
+# A notification the bot decided to send; the fields match send_to_slack's arguments
+Notification = namedtuple('Notification', 'recipient message link card_id rule')
+
+
+class Cadence(namedtuple('Cadence', 'field values start every', defaults=((), None, None))):
+    # Fires when `field` is one of `values`, or when it is >= `start` and a multiple of `every` past it
+    __slots__ = ()
+
+    def matches(self, value):
+        return value is not None and (value in self.values or self.in_cycle(value))
+
+    def in_cycle(self, value):
+        return self.start is not None and value >= self.start and (value - self.start) % self.every == 0
+
+    def sql(self, expr):
+        predicates = []
+        if self.values:
+            predicates.append(f"{expr} IN ({', '.join(str(value) for value in self.values)})")
+        if self.start is not None:
+            predicates.append(f"({expr} >= {self.start} AND MOD({expr} - {self.start}, {self.every}) = 0)")
+        return " OR ".join(predicates)
+
+
+# requires: (fact, expected truthiness) pairs, e.g. (('sla', False),)
+# orphan_issue: issue reported to the POC instead when the card has no creator
+# poc_issue: if set, the reminder always goes to the POC with this issue
+TaskRule = namedtuple(
+    'TaskRule', 'name status message cadence requires orphan_issue poc_issue track_overdue',
+    defaults=(None, (), None, None, False)
+)
+
+# poc_message: if set, only the POC is notified with this message
+RecoRule = namedtuple(
+    'RecoRule', 'name owner_message creator_message cadence requires poc_message',
+    defaults=(None, None, None, (), None)
+)
+
+
+UNDER_REVIEW = "⏳ This request is under review. Could you please double-check to make sure everything looks good?"
+DEADLINE_SOON = "⏳ Just a heads-up, the deadline for this request is coming up soon. Let's make sure we get it done on time!"
+DEADLINE_PASSED = "🚨 Oops! The deadline for this request has passed. Please respond as soon as you can. Thanks!"
+ON_HOLD = "😴 This request is on hold for now. Could you please provide an update?"
+PENDING_INFO = "👀 This request needs a bit more information to be processed. Could you please take a look and make sure everything looks good?"
+NO_CREATOR = "This card doesn't have a creator - Please take care of it"
+
+TASK_RULES = [
+    TaskRule('lead_time_4', STATUS_REVIEWERS_ON_IT, UNDER_REVIEW, Cadence('lead_time', values=(4,)), orphan_issue=NO_CREATOR),
+    TaskRule('lead_time_8', STATUS_REVIEWERS_ON_IT, DEADLINE_SOON, Cadence('lead_time', values=(8,)), orphan_issue=NO_CREATOR),
+    TaskRule('lead_time_10', STATUS_REVIEWERS_ON_IT, DEADLINE_PASSED, Cadence('lead_time', values=(10,)), orphan_issue=NO_CREATOR),
+    TaskRule('lead_time_overdue', STATUS_REVIEWERS_ON_IT, DEADLINE_PASSED, Cadence('lead_time', start=12, every=2),
+             orphan_issue=NO_CREATOR, track_overdue=True),
+    TaskRule('on_hold_cycle', STATUS_ON_HOLD, ON_HOLD, Cadence('days_since_sla', start=30, every=30),
+             orphan_issue=f"⚠️ Error: {NO_CREATOR}"),
+    TaskRule('on_hold_no_sla', STATUS_ON_HOLD, ON_HOLD, requires=(('sla', False),),
+             poc_issue="⚠️ Error: This card has no SLA - Please take care of it"),
+    TaskRule('on_hold_no_creator', STATUS_ON_HOLD, ON_HOLD, requires=(('sla', True), ('creator', False)),
+             poc_issue="⚠️ Error: This card has a SLA but no creator - Please take care of it"),
+    TaskRule('pending_info_cycle', STATUS_PENDING_INFO, PENDING_INFO, Cadence('days_since_sla', start=5, every=5),
+             orphan_issue="This card doesn't have creator - Please take care of it"),
+    TaskRule('pending_info_no_sla', STATUS_PENDING_INFO, PENDING_INFO, requires=(('sla', False),),
+             poc_issue="⚠️ This card has no SLA - Please Take Care of It"),
+]
+
+RECO_RULES = [
+    RecoRule('no_owner', requires=(('owner', False),),
+             poc_message="*Issue 🚨 : No Owner*\nHey @{poc}, This card has no owner. Please have a look."),
+    RecoRule(
+        'eta_10', cadence=Cadence('days_until_eta', values=(10,)), requires=(('owner', True),),
+        owner_message="⏳ Your recommendation card is waiting for you! Please do not forget to contact the Requestor of the card to keep him informed of the progress of the recommendation's implementation and, if necessary, ask him questions to implement it properly.",
+        creator_message="⏳ Your recommendation card is waiting for you! Please do not forget to contact the @{owner} of the card to make sure it is currently being implemented."),
+    RecoRule(
+        'eta_0', cadence=Cadence('days_until_eta', values=(0,)), requires=(('owner', True),),
+        owner_message="⚠️ Your recommendation's ETA is coming to an end. Please do not forget to complete it with your audit trail, or to notify the Requestor that the implementation of your recommendation has to be postponed.",
+        creator_message="⚠️ Your recommendation's ETA is coming to an end. Please do not forget to complete it with your rationale for closure, or to postpone the ETA if needed."),
+    RecoRule(
+        'eta_late', cadence=Cadence('days_late', start=2, every=2), requires=(('owner', True),),
+        owner_message="🚨 Your recommendation card is late! Please have a look and update it accordingly.",
+        creator_message="🚨 Your recommendation card is late! Please have a look and update it accordingly."),
+]
+
+
+class RuleIndex:
+    """Rules compiled into per-status lookup tables.
+
+    Cadences on exact values are resolved with a dict lookup on the fact's
+    value; only cyclic cadences and rules without a cadence are checked one
+    by one, so the cost per row does not grow with the number of milestones.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._groups = {}
+        for position, rule in enumerate(self.rules):
+            exact, cyclic, always = self._groups.setdefault(getattr(rule, 'status', None), ({}, [], []))
+            if rule.cadence is None:
+                always.append((position, rule))
+                continue
+            for value in rule.cadence.values:
+                exact.setdefault(rule.cadence.field, {}).setdefault(value, []).append((position, rule))
+            if rule.cadence.start is not None:
+                cyclic.append((position, rule))
+
+    def match(self, status, facts):
+        group = self._groups.get(status)
+        if group is None:
+            return []
+        exact, cyclic, always = group
+        matched = list(always)
+        for field, by_value in exact.items():
+            matched.extend(by_value.get(facts.get(field), ()))
+        for position, rule in cyclic:
+            value = facts.get(rule.cadence.field)
+            if value is not None and rule.cadence.in_cycle(value):
+                matched.append((position, rule))
+        matched.sort(key=lambda entry: entry[0])
+        return [rule for _, rule in matched if all(bool(facts.get(fact)) == expected for fact, expected in rule.requires)]
+
+    def statuses(self):
+        return [status for status in self._groups if status is not None]
+
+    def rules_for(self, status):
+        return [rule for rule in self.rules if getattr(rule, 'status', None) == status]
+
+
+TASK_INDEX = RuleIndex(TASK_RULES)
+RECO_INDEX = RuleIndex(RECO_RULES)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value, fmt):
+    try:
+        if fmt == "%Y-%m-%d":
+            # Also accepts ISO timestamps, e.g. dates serialized from a datetime column
+            return date.fromisoformat(value[:10])
+        return datetime.strptime(value, fmt).date()
+    except ValueError:
+        # A malformed date counts as missing, as TRY_TO_DATE does in the pushed-down query
+        return None
+
+
+def to_date(value, fmt="%Y-%m-%d"):
+    # Snowflake may hand back strings, datetimes or dates; many rows share the same dates.
+    # Empty strings are no date, like NULL.
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _parse_date(value, fmt)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def slack_name(email):
+    return email.split('@')[0]
+
+
+def task_facts(card, today):
+    sla_date = card.sla_date
+    return {
+        'lead_time': card.lead_time,
+        'days_since_sla': (today - sla_date).days if sla_date else None,
+        'sla': sla_date is not None,
+        'creator': bool(card.mail),
+    }
+
+
+def evaluate_task(card, today, poc):
+    # Returns the rules a card (a records.TaskCard) fires today and the notifications they produce
+    status = card.status
+    rules = TASK_INDEX.match(status, task_facts(card, today))
+    link = card.link
+    request_name = card.request
+    card_id = card.id
+    creator_email = card.mail
+    poc_email = f"{poc}@example.com"
+
+    notifications = []
+    reminded = set()
+    for rule in rules:
+        issue = rule.poc_issue or (None if creator_email else rule.orphan_issue)
+        if issue:
+            message = f"Hey @{poc}\n\n*Issue : {status}*\n{issue}\n\n{rule.message}\n\n<{link}|{request_name}>"
+            notifications.append(Notification(poc_email, message, link, card_id, rule.name))
+        else:
+            message = f"Hey @{slack_name(creator_email)}\n\n{rule.message}\n\n<{link}|{request_name}>"
+            notifications.append(Notification(creator_email, message, link, card_id, rule.name))
+
+        for validation, reviewer_email in zip(card.validations[::2], card.validations[1::2]):
+            if reviewer_email and (validation is None or validation == ''):
+                message = f"*Reviewer Reminder:* Hey @{slack_name(reviewer_email)},\n\n{rule.message}\nThanks 😉.\n\n<{link}|{request_name}>"
+                # Rules sharing a message (e.g. a cycle and a missing creator), or a reviewer named
+                # for several validations, still make one reminder
+                if (reviewer_email, message) in reminded:
+                    continue
+                reminded.add((reviewer_email, message))
+                notifications.append(Notification(reviewer_email, message, link, card_id, f"reviewer:{rule.name}"))
+    return rules, notifications
+
+
+def reco_facts(reco, today):
+    eta_date = reco.eta_date
+    days_until_eta = (eta_date - today).days if eta_date else None
+    return {
+        'days_until_eta': days_until_eta,
+        'days_late': -days_until_eta if days_until_eta is not None else None,
+        'owner': bool(reco.owner_reco),
+    }
+
+
+def evaluate_recommendation(reco, today, poc):
+    # Same for a records.Recommendation
+    rules = RECO_INDEX.match(None, reco_facts(reco, today))
+    reco_link = reco.reco
+    owner_reco = reco.owner_reco
+    creator_reco = reco.creator_reco
+    footer = f"\n\nLink = <{reco_link}|{reco.condition}>"
+
+    notifications = []
+    for rule in rules:
+        if rule.poc_message:
+            message = rule.poc_message.format(poc=poc) + footer
+            notifications.append(Notification(f"{poc}@example.com", message, reco_link, reco_link, rule.name))
+            continue
+        for recipient, template in ((owner_reco, rule.owner_message), (creator_reco, rule.creator_message)):
+            if recipient and template:
+                text = template.format(owner=slack_name(owner_reco))
+                message = f"Hey @{slack_name(recipient)}\n\n{text}{footer}"
+                notifications.append(Notification(recipient, message, reco_link, reco_link, rule.name))
+    return rules, notifications
@@ -0,0 +1,78 @@
+import logging
+from datetime import date
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from .request import get_snowflake_connection
+from .slack_cache import SLACK_USER_CACHE_WARM
+from .state import resume_pending
+from .shards import job_key
+from .metrics import metrics
+from .notifier import clients, report_error, flush, close
+from . import tasks, recos
+
+# Job modules: each has JOB, RECORD, run_day, run_shard, fetch_rows(conn) and process_rows(records)
+JOBS = {
+    'tasks': tasks,
+    'recos': recos,
+}
+
+def run(job, conn, deliver=True, today=None, shard=None):
+    # Runs a job module once on an open Snowflake connection; Slack clients and caches stay open.
+    # With deliver=False the caller flushes queued messages, e.g. once for several jobs.
+    # With a shard, only that partition of the cards is fetched and checkpointed.
+    job.run_day = today or date.today()
+    job.run_shard = shard
+    try:
+        if clients.state.planning_finished(job_key(job.JOB, shard), job.run_day):
+            resume_pending(clients.state, job.JOB, job.run_day)
+            return True
+
+        count = job.process_rows(job.fetch_rows(conn))
+        clients.state.finish_planning(job_key(job.JOB, shard), job.run_day)
+
+        logging.info(f"Processed all {count} {job.JOB}.")
+        metrics.inc('rows_total', count, job=job.JOB)
+        return True
+
+    except Exception as e:
+        error_message = f"Error executing query or processing results: {str(e)}"
+        logging.error(error_message)
+        metrics.inc('run_errors_total', job=job.JOB, code=type(e).__name__)
+        report_error(error_message, type(e).__name__)
+        return False
+    finally:
+        if deliver:
+            flush()
+
+def run_all(conn, today=None, shard=None):
+    # Both jobs query concurrently on the same session (one cursor each) and share one Slack dispatch path
+    with ThreadPoolExecutor(max_workers=len(JOBS), thread_name_prefix='job') as pool:
+        futures = {name: pool.submit(run, job, conn, False, today, shard) for name, job in JOBS.items()}
+    results = {name: future.result() for name, future in futures.items()}
+    for name, ok in results.items():
+        logging.info(f"Job '{name}' {'finished' if ok else 'failed'}.")
+    flush()
+    return all(results.values())
+
+def runner_for(name):
+    # run_fn(conn, today=None, shard=None) for 'tasks', 'recos', or 'all' (both jobs on one session)
+    return run_all if name == 'all' else partial(run, JOBS[name])
+
+def main(name='all'):
+    # Returns True if the run finished, so the command can exit with an error otherwise
+    ok = False
+    conn = None
+    try:
+        if SLACK_USER_CACHE_WARM:
+            clients.user_cache.warm()
+        conn = get_snowflake_connection()
+        ok = runner_for(name)(conn)
+    except Exception as e:
+        error_message = f"Error connecting to Snowflake: {str(e)}"
+        logging.error(error_message)
+        report_error(error_message, type(e).__name__)
+    finally:
+        if conn:
+            conn.close()
+        close()
+    return ok
@@ -0,0 +1,212 @@
+import os
+import json
+import socket
+import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from .metrics import metrics, NOTION_BOT_METRICS_PATH
+
+# Sharded runs: each shard takes a hash partition of the card keys (see request.shard_predicate).
+# Leases live in NOTION_SHARD_LEASE_DIR, which must be a shared volume when shards run in several containers.
+NOTION_SHARD_LEASE_DIR = os.getenv('NOTION_SHARD_LEASE_DIR', 'notion_bot_leases')
+# A shard that is neither finished nor failed after this long belongs to a worker that died
+NOTION_SHARD_LEASE_MINUTES = int(os.getenv('NOTION_SHARD_LEASE_MINUTES', 120))
+
+
+class Shard(namedtuple('Shard', 'index count')):
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return f"{self.index}of{self.count}"
+
+
+def job_key(job, shard):
+    # Name under which a shard keeps its checkpoints and snapshot in the state store
+    return job if shard is None else f"{job}:{shard.name}"
+
+
+class ShardLease:
+    """Lock file that lets one worker run a shard of a job once per day.
+
+    Each attempt is a file created with O_EXCL, so of the processes or containers sharing the
+    lease directory exactly one owns it. The owner marks it finished or failed when the run ends.
+    A failed attempt, or one still running after NOTION_SHARD_LEASE_MINUTES, lets the next
+    worker create the following attempt; a finished one means the shard is done for the day.
+
+    With a `store_id`, the shard is also pinned to the state store that ran it first: its outbox,
+    sent ledger and overdue tracker live there, so workers using another store never run it.
+    """
+
+    def __init__(self, job, day, shard, directory=NOTION_SHARD_LEASE_DIR, ttl_minutes=NOTION_SHARD_LEASE_MINUTES,
+                 store_id=None):
+        self.prefix = os.path.join(directory, f"{job}-{day.isoformat()}-{shard.name}")
+        self.pin_path = os.path.join(directory, f"{job}-{shard.name}.store")
+        self.store_id = store_id
+        self.directory = directory
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.path = None
+
+    def acquire(self, now=None):
+        # Returns False if the shard is finished or another worker is running it
+        now = now or datetime.now()
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._pinned_here():
+            return False
+        attempt = 1
+        while True:
+            path = f"{self.prefix}.{attempt}.lease"
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                state, started = self._read(path)
+                if state == 'finished':
+                    return False
+                if state == 'running' and now - started < self.ttl:
+                    return False
+                attempt += 1
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'state': 'running', 'owner': self.owner, 'started_at': now.isoformat()}, f)
+            self.path = path
+            return True
+
+    def release(self, ok):
+        if self.path is None:
+            return
+        state, started = self._read(self.path)
+        # Write then rename, so other workers never read a half-written lease
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'state': 'finished' if ok else 'failed', 'owner': self.owner,
+                       'started_at': started.isoformat(), 'ended_at': datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self.path)
+        self.path = None
+
+    def _pinned_here(self):
+        if self.store_id is None:
+            return True
+        # Hard-linking a complete file is atomic and fails if another store pinned the shard first
+        tmp_path = f"{self.pin_path}.{self.store_id}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.store_id)
+        try:
+            os.link(tmp_path, self.pin_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+        with open(self.pin_path) as f:
+            pinned = f.read()
+        if pinned != self.store_id:
+            logging.warning(f"{self.pin_path} pins this shard to state store {pinned}, not {self.store_id}: "
+                            f"run it where that store lives, or delete the file to move the shard and its history.")
+            return False
+        return True
+
+    def _read(self, path):
+        # A lease whose content is not written yet was just created: it counts as running
+        try:
+            with open(path) as f:
+                lease = json.load(f)
+            return lease['state'], datetime.fromisoformat(lease['started_at'])
+        except (ValueError, KeyError):
+            return 'running', datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def run_shard(job, shard, today=None):
+    """Runs one shard of a job on its own Snowflake session and Slack clients.
+
+    Returns True or False for the run's outcome, or None if the lease says another worker
+    has the shard.
+    """
+    # Imported here: the job modules import this one
+    from . import notifier, runner
+    from .request import get_snowflake_connection
+    today = today or date.today()
+    lease = ShardLease(job, today, shard, store_id=notifier.clients.state.store_id())
+    if not lease.acquire():
+        logging.info(f"Shard {shard.name} of '{job}' is done, taken or pinned elsewhere for {today}, skipping.")
+        notifier.close()
+        return None
+
+    # Each shard exports its own metrics, labelled with the shard
+    metrics.reset()
+    metrics.labels['shard'] = shard.name
+    metrics.path = shard_path(NOTION_BOT_METRICS_PATH, shard)
+    logging.info(f"Running shard {shard.name} of '{job}' for {today}")
+    ok = False
+    conn = None
+    try:
+        conn = get_snowflake_connection()
+        ok = runner.runner_for(job)(conn, today=today, shard=shard)
+    except Exception as e:
+        error_message = f"Shard {shard.name} of '{job}' failed: {str(e)}"
+        logging.error(error_message)
+        notifier.report_error(error_message, type(e).__name__)
+    finally:
+        if conn:
+            conn.close()
+        notifier.close()
+        lease.release(ok)
+    logging.info(f"Shard {shard.name} of '{job}' {'finished' if ok else 'failed'}.")
+    return ok
+
+
+def shard_path(path, shard):
+    # notion_bot.prom -> notion_bot.2of4.prom, so shards do not overwrite each other's metrics
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard.name}{ext}"
+
+
+def run_sharded(job, count, indices=None, workers=None, today=None):
+    """Runs shards of a job in a pool of worker processes; returns False if any of them failed.
+
+    Without `indices` every shard is tried. Shards already finished today, or leased by a worker
+    in another container sharing NOTION_SHARD_LEASE_DIR, are skipped, so several containers can
+    run the same command and split the shards between them. A shard stays with the container whose
+    state store first ran it, since that store holds what was already delivered. Slack rate limits
+    are divided between the local workers; across containers, lower SLACK_RATE_LIMIT_SCALE accordingly.
+    """
+    shards = [Shard(index, count) for index in (range(count) if indices is None else indices)]
+    workers = min(workers or len(shards), len(shards))
+    today = today or date.today()
+    from .slack_cache import SLACK_USER_CACHE_WARM
+    if SLACK_USER_CACHE_WARM:
+        # One users.list sweep shared by all the workers through the cache file
+        from . import notifier
+        notifier.clients.user_cache.warm()
+        notifier.close()
+
+    logging.info(f"Running {len(shards)} of {count} shards of '{job}' on {workers} worker processes")
+    if workers == 1:
+        results = {shard: run_shard(job, shard, today) for shard in shards}
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(1 / workers,)) as pool:
+            futures = {shard: pool.submit(run_shard, job, shard, today) for shard in shards}
+        results = {}
+        for shard, future in futures.items():
+            try:
+                results[shard] = future.result()
+            except Exception as e:
+                logging.error(f"Worker for shard {shard.name} of '{job}' crashed: {str(e)}")
+                results[shard] = False
+
+    ran = [shard.name for shard, ok in results.items() if ok is not None]
+    failed = [shard.name for shard, ok in results.items() if ok is False]
+    logging.info(f"Sharded '{job}' run: {len(ran)} shards run, {len(results) - len(ran)} skipped, {len(failed)} failed.")
+    if failed:
+        logging.error(f"Failed shards of '{job}': {', '.join(failed)}")
+    return not failed
+
+
+def _init_worker(rate_share):
+    # Workers started with spawn (macOS, Windows) do not inherit the parent's logging setup
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # The local workers share the Slack rate limits of the app
+    from . import dispatch
+    dispatch.SLACK_RATE_LIMIT_SCALE *= rate_share
@@ -0,0 +1,139 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from .state import SQLITE_BUSY_TIMEOUT
+
+# Cache configuration
+SLACK_USER_CACHE_PATH = os.getenv('SLACK_USER_CACHE_PATH', 'slack_user_cache.db')
+SLACK_USER_CACHE_TTL = int(os.getenv('SLACK_USER_CACHE_TTL', 7 * 24 * 3600))  # 7 days
+SLACK_USER_CACHE_NEGATIVE_TTL = int(os.getenv('SLACK_USER_CACHE_NEGATIVE_TTL', 24 * 3600))  # 1 day
+SLACK_USER_CACHE_SIZE = int(os.getenv('SLACK_USER_CACHE_SIZE', 2048))
+SLACK_USER_CACHE_WARM = os.getenv('SLACK_USER_CACHE_WARM', '').lower() in ('1', 'true', 'yes')
+
+_MISS = object()
+
+
+class SlackUserCache:
+    """Resolves emails to Slack user IDs through an in-process LRU backed by SQLite.
+
+    Users that Slack does not know (`users_not_found`) are cached as well, with a
+    shorter TTL, so a bad address in Notion is not looked up again on every card.
+    """
+
+    def __init__(self, client, path=SLACK_USER_CACHE_PATH, ttl=SLACK_USER_CACHE_TTL,
+                 negative_ttl=SLACK_USER_CACHE_NEGATIVE_TTL, max_size=SLACK_USER_CACHE_SIZE):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.lookups = 0
+        self.hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS slack_users ("
+            " email TEXT PRIMARY KEY,"
+            " user_id TEXT,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def lookup(self, email):
+        # Returns the Slack user ID, or None if Slack has no user for this email
+        key = email.strip().lower()
+        user_id = self._get(key)
+        if user_id is not _MISS:
+            self.hits += 1
+            return user_id
+
+        self.lookups += 1
+        # slack_sdk is only loaded once Slack is actually called
+        from slack_sdk.errors import SlackApiError
+        try:
+            response = self.client.users_lookupByEmail(email=email)
+        except SlackApiError as e:
+            if e.response['error'] != 'users_not_found':
+                raise
+            self._put(key, None, self.negative_ttl)
+            return None
+
+        if not response['ok']:
+            if response['error'] == 'users_not_found':
+                self._put(key, None, self.negative_ttl)
+                return None
+            raise SlackApiError(f"users.lookupByEmail failed for {email}", response)
+
+        user_id = response['user']['id']
+        self._put(key, user_id, self.ttl)
+        return user_id
+
+    def warm(self, page_size=200):
+        # Bulk-load the whole workspace with a paginated users.list sweep
+        logging.info("Warming Slack user cache from users.list...")
+        expires_at = time.time() + self.ttl
+        entries = []
+        cursor = None
+        while True:
+            response = self.client.users_list(cursor=cursor, limit=page_size)
+            for member in response['members']:
+                email = member.get('profile', {}).get('email')
+                if email and not member.get('deleted') and not member.get('is_bot'):
+                    entries.append((email.strip().lower(), member['id'], expires_at))
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO slack_users (email, user_id, expires_at) VALUES (?, ?, ?)",
+                entries
+            )
+            self._db.commit()
+            for email, user_id, expires in entries[-self.max_size:]:
+                self._remember(email, user_id, expires)
+        logging.info(f"Slack user cache warmed with {len(entries)} users.")
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                user_id, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return user_id
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT user_id, expires_at FROM slack_users WHERE email = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return _MISS
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def _put(self, key, user_id, ttl):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, user_id, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO slack_users (email, user_id, expires_at) VALUES (?, ?, ?)",
+                (key, user_id, expires_at)
+            )
+            self._db.commit()
+
+    def _remember(self, key, user_id, expires_at):
+        self._memory[key] = (user_id, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
@@ -0,0 +1,353 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# State store configuration
+NOTION_BOT_STATE_PATH = os.getenv('NOTION_BOT_STATE_PATH', 'notion_bot_state.db')
+OVERDUE_FORGET_DAYS = int(os.getenv('OVERDUE_FORGET_DAYS', 4))
+# Outbox: failed deliveries are retried after NOTION_OUTBOX_BACKOFF_SECONDS, doubling up to the maximum,
+# until NOTION_OUTBOX_TTL_HOURS after they were planned
+NOTION_OUTBOX_BACKOFF_SECONDS = int(os.getenv('NOTION_OUTBOX_BACKOFF_SECONDS', 30))
+NOTION_OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv('NOTION_OUTBOX_MAX_BACKOFF_SECONDS', 3600))
+NOTION_OUTBOX_TTL_HOURS = float(os.getenv('NOTION_OUTBOX_TTL_HOURS', 12))
+# A worker delivering a notification owns it for this long; after that, e.g. if the worker died, another may retry it
+NOTION_OUTBOX_CLAIM_SECONDS = int(os.getenv('NOTION_OUTBOX_CLAIM_SECONDS', 600))
+SQLITE_BUSY_TIMEOUT = 30  # seconds a write waits for another process holding the lock
+
+
+class StateStore:
+    """Persists what the bot must remember between runs.
+
+    - overdue_cards: cards with LEAD_TIME >= 12 and when they were last reminded
+    - outbox: notifications a run decided to send and Slack has not accepted yet, keyed by
+      (card, recipient, rule, day), with their delivery attempts, retry schedule and the claim
+      of the worker delivering them
+    - sent: the ledger of notifications Slack accepted, with the same key
+    - runs: the days on which a job finished planning, so a rerun only resumes delivery
+    - snapshot / sync: the local copy of card state kept by incremental runs, and their watermarks
+    - meta: the store's random id, which sharded runs pin their shards to
+    """
+
+    def __init__(self, path=NOTION_BOT_STATE_PATH):
+        self._lock = threading.Lock()
+        # Shard workers share the file: wait for each other's writes, and let readers run alongside them
+        self._db = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS overdue_cards (
+                card_id TEXT PRIMARY KEY,
+                creator_email TEXT,
+                last_sent TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS outbox (
+                job TEXT NOT NULL,
+                day TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                rule TEXT NOT NULL,
+                message TEXT NOT NULL,
+                link TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL,
+                last_error TEXT,
+                claimed_until TEXT,
+                PRIMARY KEY (card_id, recipient, rule, day)
+            );
+            CREATE TABLE IF NOT EXISTS sent (
+                card_id TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                rule TEXT NOT NULL,
+                day TEXT NOT NULL,
+                sent_at TEXT NOT NULL,
+                PRIMARY KEY (card_id, recipient, rule, day)
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                job TEXT NOT NULL,
+                day TEXT NOT NULL,
+                planned_at TEXT NOT NULL,
+                PRIMARY KEY (job, day)
+            );
+            CREATE TABLE IF NOT EXISTS snapshot (
+                job TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                sync_id TEXT NOT NULL,
+                row TEXT NOT NULL,
+                PRIMARY KEY (job, card_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync (
+                job TEXT PRIMARY KEY,
+                watermark TEXT,
+                full_refresh_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)", (uuid.uuid4().hex,))
+        self._migrate_planned()
+        self._migrate_claims()
+        self._db.commit()
+
+    def _migrate_planned(self):
+        # Stores from before the outbox kept a `planned` table: carry over what Slack never accepted
+        if not self._db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'planned'").fetchone():
+            return
+        now = datetime.now()
+        self._db.execute(
+            "INSERT OR IGNORE INTO outbox (job, day, card_id, recipient, rule, message, link, next_attempt_at, expires_at)"
+            " SELECT p.job, p.day, p.card_id, p.recipient, p.rule, p.message, p.link, ?, ? FROM planned p"
+            " LEFT JOIN sent s ON s.card_id = p.card_id AND s.recipient = p.recipient AND s.rule = p.rule AND s.day = p.day"
+            " WHERE s.card_id IS NULL",
+            (now.isoformat(), (now + timedelta(hours=NOTION_OUTBOX_TTL_HOURS)).isoformat())
+        )
+        self._db.execute("DROP TABLE planned")
+
+    def _migrate_claims(self):
+        # Outboxes from before claims: no entry is being delivered when the store opens
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(outbox)")]
+        if 'claimed_until' not in columns:
+            self._db.execute("ALTER TABLE outbox ADD COLUMN claimed_until TEXT")
+
+    def store_id(self):
+        with self._lock:
+            return self._db.execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()[0]
+
+    # Overdue tracker
+
+    def track_overdue(self, card_id, creator_email, now=None):
+        now = (now or datetime.now()).isoformat()
+        self._execute(
+            "INSERT INTO overdue_cards (card_id, creator_email, last_sent, last_seen) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (card_id) DO UPDATE SET creator_email = excluded.creator_email,"
+            " last_sent = excluded.last_sent, last_seen = excluded.last_seen",
+            (str(card_id), creator_email, now, now)
+        )
+
+    def touch_overdue(self, card_id, now=None):
+        self._execute(
+            "UPDATE overdue_cards SET last_sent = ? WHERE card_id = ?",
+            ((now or datetime.now()).isoformat(), str(card_id))
+        )
+
+    def overdue_cards(self, now=None):
+        # Cards that have not come back as overdue for a while have been handled: forget them
+        forget_before = ((now or datetime.now()) - timedelta(days=OVERDUE_FORGET_DAYS)).isoformat()
+        self._execute("DELETE FROM overdue_cards WHERE last_seen < ?", (forget_before,))
+        with self._lock:
+            rows = self._db.execute("SELECT card_id, last_sent, creator_email FROM overdue_cards").fetchall()
+        return [(card_id, datetime.fromisoformat(last_sent), creator_email) for card_id, last_sent, creator_email in rows]
+
+    # Outbox and sent ledger
+
+    def enqueue(self, job, day, card_id, recipient, rule, message, link, now=None):
+        # Returns False if the notification is already waiting in the outbox. A new entry is
+        # claimed by the caller, which delivers it right away.
+        now = now or datetime.now()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (job, day, card_id, recipient, rule, message, link, next_attempt_at, expires_at, claimed_until)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job, day.isoformat(), str(card_id), recipient, rule, message, link, now.isoformat(),
+                 (now + timedelta(hours=NOTION_OUTBOX_TTL_HOURS)).isoformat(), claim_expiry(now))
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def record_failure(self, card_id, recipient, rule, day, error, now=None):
+        # Schedule the next attempt with exponential backoff and release the claim
+        now = now or datetime.now()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts FROM outbox WHERE card_id = ? AND recipient = ? AND rule = ? AND day = ?",
+                (str(card_id), recipient, rule, day.isoformat())
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            self._db.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ?, claimed_until = NULL"
+                " WHERE card_id = ? AND recipient = ? AND rule = ? AND day = ?",
+                (attempts, (now + timedelta(seconds=backoff_delay(attempts))).isoformat(), error,
+                 str(card_id), recipient, rule, day.isoformat())
+            )
+            self._db.commit()
+
+    def discard(self, card_id, recipient, rule, day):
+        # Give up on a notification that cannot be delivered, e.g. to an address Slack does not know
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM outbox WHERE card_id = ? AND recipient = ? AND rule = ? AND day = ?",
+                (str(card_id), recipient, rule, day.isoformat())
+            )
+            self._db.commit()
+
+    def due(self, now=None):
+        # Claims the outbox entries whose next attempt has come and that no other worker is delivering,
+        # oldest first. The claim is taken in one write transaction, so processes sharing the store
+        # never get the same entry.
+        now = now or datetime.now()
+        where = " WHERE next_attempt_at <= ? AND expires_at > ? AND (claimed_until IS NULL OR claimed_until <= ?)"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT card_id, recipient, rule, day, message, link FROM outbox" + where + " ORDER BY next_attempt_at",
+                    (now.isoformat(),) * 3
+                ).fetchall()
+                self._db.execute("UPDATE outbox SET claimed_until = ?" + where, (claim_expiry(now),) + (now.isoformat(),) * 3)
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return [(card_id, recipient, rule, date.fromisoformat(day), message, link) for card_id, recipient, rule, day, message, link in rows]
+
+    def next_attempt(self, now=None):
+        # Entries claimed by a worker are left to it until it releases them or the claim runs out
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE expires_at > ? AND (claimed_until IS NULL OR claimed_until <= ?)",
+                ((now or datetime.now()).isoformat(),) * 2
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def expire(self, now=None):
+        # Drop reminders that went stale before Slack accepted them
+        with self._lock:
+            expired = self._db.execute(
+                "SELECT card_id, recipient, rule, attempts, last_error FROM outbox WHERE expires_at <= ?",
+                ((now or datetime.now()).isoformat(),)
+            ).fetchall()
+            self._db.execute("DELETE FROM outbox WHERE expires_at <= ?", ((now or datetime.now()).isoformat(),))
+            self._db.commit()
+        return expired
+
+    def already_sent(self, card_id, recipient, rule, day):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM sent WHERE card_id = ? AND recipient = ? AND rule = ? AND day = ?",
+                (str(card_id), recipient, rule, day.isoformat())
+            ).fetchone()
+        return row is not None
+
+    def record_sent(self, card_id, recipient, rule, day):
+        key = (str(card_id), recipient, rule, day.isoformat())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO sent (card_id, recipient, rule, day, sent_at) VALUES (?, ?, ?, ?, ?)",
+                key + (datetime.now().isoformat(),)
+            )
+            self._db.execute("DELETE FROM outbox WHERE card_id = ? AND recipient = ? AND rule = ? AND day = ?", key)
+            self._db.commit()
+
+    def pending(self, job, day):
+        # Notifications of a day that are still in the outbox
+        with self._lock:
+            return self._db.execute(
+                "SELECT card_id, recipient, rule, message, link FROM outbox WHERE job = ? AND day = ?",
+                (job, day.isoformat())
+            ).fetchall()
+
+    # Run checkpoints
+
+    def finish_planning(self, job, day):
+        self._execute(
+            "INSERT OR IGNORE INTO runs (job, day, planned_at) VALUES (?, ?, ?)",
+            (job, day.isoformat(), datetime.now().isoformat())
+        )
+
+    def planning_finished(self, job, day):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM runs WHERE job = ? AND day = ?", (job, day.isoformat())).fetchone()
+        return row is not None
+
+    # Incremental snapshot
+
+    def sync_status(self, job):
+        with self._lock:
+            row = self._db.execute("SELECT watermark, full_refresh_at FROM sync WHERE job = ?", (job,)).fetchone()
+        if row is None:
+            return None, None
+        return row[0], datetime.fromisoformat(row[1])
+
+    def save_sync(self, job, watermark, full_refresh_at):
+        self._execute(
+            "INSERT OR REPLACE INTO sync (job, watermark, full_refresh_at) VALUES (?, ?, ?)",
+            (job, watermark, full_refresh_at.isoformat())
+        )
+
+    def merge_snapshot(self, job, sync_id, upserts, deletes):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO snapshot (job, card_id, sync_id, row) VALUES (?, ?, ?, ?)",
+                [(job, str(card_id), sync_id, json.dumps(row, default=json_default)) for card_id, row in upserts]
+            )
+            self._db.executemany(
+                "DELETE FROM snapshot WHERE job = ? AND card_id = ?",
+                [(job, str(card_id)) for card_id in deletes]
+            )
+            self._db.commit()
+
+    def sweep_snapshot(self, job, sync_id):
+        # After a full refresh, drop the cards that no longer exist upstream
+        self._execute("DELETE FROM snapshot WHERE job = ? AND sync_id <> ?", (job, sync_id))
+
+    def iter_snapshot(self, job):
+        with self._lock:
+            rows = self._db.execute("SELECT row FROM snapshot WHERE job = ?", (job,)).fetchall()
+        for (row,) in rows:
+            yield json.loads(row)
+
+    @contextmanager
+    def scratch(self):
+        # Work on an in-memory copy: dry runs see the real history but never change it
+        with self._lock:
+            real, copy = self._db, sqlite3.connect(':memory:', check_same_thread=False)
+            real.backup(copy)
+            self._db = copy
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._db = real
+            copy.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, params):
+        with self._lock:
+            self._db.execute(sql, params)
+            self._db.commit()
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def claim_expiry(now):
+    return (now + timedelta(seconds=NOTION_OUTBOX_CLAIM_SECONDS)).isoformat()
+
+
+def backoff_delay(attempts):
+    return min(NOTION_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), NOTION_OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def resume_pending(state, job, day):
+    # A rerun does not query Snowflake again: what is left in the outbox is delivered when the run is flushed
+    pending = state.pending(job, day)
+    logging.info(f"Run '{job}' for {day} was already planned, {len(pending)} notifications are still in the outbox.")
+    return len(pending)
@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from .request import NOTION_BOT_BATCH_MODE, iter_query, TASKS_TABLE, TASK_COLUMNS
+from .records import TaskCard
+from .rules import evaluate_task, TASK_INDEX
+from .incremental import sync_snapshot, NOTION_BOT_INCREMENTAL
+from .shards import job_key
+from .metrics import metrics, log_row
+from .notifier import clients, notify
+
+TEST_MODE = False
+TEST_EMAIL = 'test@example.com'  # Anonymized test email
+POC_REGULATORY = 'poc_username'  # Anonymized POC username
+
+JOB = 'tasks'
+TASK_STATUSES = set(TASK_INDEX.statuses())
+RECORD = TaskCard
+run_day = date.today()
+run_shard = None  # both set by runner.run; a shard for sharded runs, see shards.py
+
+def run_time():
+    # The run's day at the current time of day: a plan for another day tracks and ages cards as on that day
+    return datetime.combine(run_day, datetime.now().time())
+
+def send_to_slack(email, message, link, card_id=None, rule=None):
+    if TEST_MODE:
+        email = TEST_EMAIL
+    notify(JOB, run_day, email, message, link, card_id, rule)
+
+def process_row(card):
+    card_id = card.id
+    log_row("Processing row", card_id, LEAD_TIME=card.lead_time, STATUS=card.status, REQUEST=card.request)
+    
+    with metrics.timer('decision'):
+        rules, notifications = evaluate_task(card, run_day, POC_REGULATORY)
+    if not rules:
+        log_row("No action needed", card_id, STATUS=card.status, LEAD_TIME=card.lead_time)
+        return
+    
+    log_row("Rules fired", card_id, rules=', '.join(rule.name for rule in rules))
+    for rule in rules:
+        metrics.inc('rules_fired_total', job=JOB, rule=rule.name)
+    for notification in notifications:
+        send_to_slack(*notification)
+    
+    if any(rule.track_overdue for rule in rules):
+        clients.state.track_overdue(card.id, card.mail, run_time())
+
+def check_overdue_cards(current_time=None):
+    # Shards sharing a state file all see the whole tracker; the outbox key sends each follow-up once
+    current_time = current_time or datetime.now()
+    for card_id, last_sent, creator_email in clients.state.overdue_cards(current_time):
+        # Calendar days: a daily run starting a little earlier than the last one must not skip a day
+        if (current_time.date() - last_sent.date()).days >= 2:
+            if creator_email:
+                creator_slack = creator_email.split('@')[0]
+                message = f"Hey @{creator_slack}\n\n🚨 Reminder: Your card {card_id} is still overdue. Please respond as soon as you can. Thanks!"
+                send_to_slack(creator_email, message, "", card_id, "overdue_followup")
+            else:
+                message = f"Hey @{POC_REGULATORY}\n\n🚨 Reminder: Card {card_id} is still overdue and has no creator. Please check and take necessary action. Thanks!"
+                send_to_slack(f"{POC_REGULATORY}@example.com", message, "", card_id, "overdue_followup")
+            clients.state.touch_overdue(card_id, current_time)
+            log_row("Sent overdue reminder", card_id, card=card_id)
+
+def fetch_rows(conn):
+    # Yields the cards to evaluate as TaskCard records
+    if NOTION_BOT_INCREMENTAL:
+        # Fetch only changed cards, then evaluate date-driven reminders on the local snapshot
+        return map(TaskCard.from_dict, sync_snapshot(conn, clients.state, job_key(JOB, run_shard), TASKS_TABLE, TASK_COLUMNS, 'ID', keep=lambda row: row.get('STATUS') in TASK_STATUSES, now=run_time(), shard=run_shard))
+    if NOTION_BOT_BATCH_MODE:
+        # pandas/NumPy are only needed for large backfills, so import them on demand
+        from .batch import iter_task_rows
+        return iter_task_rows(conn, run_day, shard=run_shard)
+    return iter_query(conn, run_day, shard=run_shard)
+
+def process_rows(cards):
+    # Evaluates every card, then the overdue follow-ups; returns the number of cards
+    count = 0
+    for card in cards:
+        process_row(card)
+        count += 1
+    check_overdue_cards(run_time())
+    return count
@@ -0,0 +1,60 @@
+from notion_bot.digest import DigestCollector, paginate, SLACK_MAX_BLOCKS
+
+
+class FakeDispatcher:
+    def __init__(self, failing=()):
+        self.messages = []
+        self.failing = failing
+
+    def submit_blocks(self, email, blocks, text, on_sent=None, on_failed=None):
+        self.messages.append((email, blocks, text))
+        if email in self.failing:
+            if on_failed:
+                on_failed('internal_error')
+        elif on_sent:
+            on_sent()
+
+
+def cards(count, link=True):
+    return [(f"Reminder {i}", f"https://www.notion.so/card-{i}" if link else "") for i in range(count)]
+
+
+def test_pages_stay_within_slack_block_limit():
+    # A header, then a section and a button per card
+    pages = paginate(cards(30))
+    assert [len(page) for page in pages] == [24, 6]
+    assert [card for page in pages for card in page] == cards(30)
+    # Cards without a link take one block
+    assert [len(page) for page in paginate(cards(60, link=False))] == [SLACK_MAX_BLOCKS - 1, 11]
+    assert paginate([]) == []
+
+
+def test_one_numbered_message_per_page_and_recipient():
+    digest = DigestCollector()
+    for message, link in cards(30):
+        digest.add("a@example.com", message, link)
+    digest.add("b@example.com", "Reminder", "")
+    dispatcher = FakeDispatcher()
+    assert digest.flush(dispatcher) == 3
+    titles = [(email, text) for email, _, text in dispatcher.messages]
+    assert titles == [
+        ("a@example.com", "📋 You have 30 Notion reminders (1/2)"),
+        ("a@example.com", "📋 You have 30 Notion reminders (2/2)"),
+        ("b@example.com", "📋 You have 1 Notion reminder"),
+    ]
+    assert all(len(blocks) <= SLACK_MAX_BLOCKS for _, blocks, _ in dispatcher.messages)
+    # Flushing starts a new collection
+    assert digest.flush(FakeDispatcher()) == 0
+
+
+def test_repeated_cards_share_a_section_and_every_callback_runs():
+    digest = DigestCollector()
+    sent, failed = [], []
+    digest.add("a@example.com", "Reminder", "https://www.notion.so/card", on_sent=lambda: sent.append(1))
+    digest.add("a@example.com", "Reminder", "https://www.notion.so/card", on_sent=lambda: sent.append(2))
+    digest.add("b@example.com", "Reminder", "", on_failed=failed.append)
+    dispatcher = FakeDispatcher(failing={"b@example.com"})
+    digest.flush(dispatcher)
+    _, blocks, _ = dispatcher.messages[0]
+    assert len(blocks) == 3
+    assert sent == [1, 2] and failed == ['internal_error']
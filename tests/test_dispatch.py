@@ -0,0 +1,160 @@
+import json
+from types import SimpleNamespace
+from importlib.util import find_spec
+import pytest
+from notion_bot import dispatch
+from notion_bot.dispatch import TokenBucket, RateLimitedClient, CircuitBreaker, ErrorAggregator, Dispatcher
+
+
+requires_slack_sdk = pytest.mark.skipif(find_spec('slack_sdk') is None, reason="needs slack_sdk")
+
+
+class Clock:
+    # Stands in for the time module: sleeping moves the clock forward
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Real sleeps always take some time, which rounding in the bucket relies on
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dispatch, 'time', clock)
+    return clock
+
+
+class FakeWebClient:
+    def __init__(self, rate_limited=()):
+        self.posts = []
+        self.rate_limited = list(rate_limited)
+
+    def chat_postMessage(self, **kwargs):
+        from slack_sdk.errors import SlackApiError
+        if kwargs['channel'] in self.rate_limited:
+            self.rate_limited.remove(kwargs['channel'])
+            raise SlackApiError("ratelimited", SimpleNamespace(status_code=429, headers={'Retry-After': '3'}))
+        self.posts.append(kwargs['channel'])
+        return {'ok': True}
+
+
+class BrokenWebClient:
+    # Slack answering every post with a server-side error
+    throttled = 0
+
+    def __init__(self):
+        self.posts = 0
+
+    def chat_postMessage(self, **kwargs):
+        self.posts += 1
+        return {'ok': False, 'error': 'internal_error'}
+
+
+class Directory:
+    def lookup(self, email):
+        return None if email.startswith('unknown') else 'U' + email.split('@')[0]
+
+
+def test_bucket_allows_a_burst_then_its_rate(clock):
+    bucket = TokenBucket(60, burst=5)
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now == 0
+    for _ in range(10):
+        bucket.acquire()
+    assert clock.now == pytest.approx(10)
+
+
+def test_concurrent_pauses_do_not_add_up(clock):
+    bucket = TokenBucket(60)
+    bucket.pause(3)
+    bucket.pause(3)
+    bucket.acquire()
+    assert clock.now == pytest.approx(4)
+
+
+@requires_slack_sdk
+def test_messages_to_different_channels_are_not_held_to_one_per_second(clock):
+    client = RateLimitedClient(FakeWebClient())
+    for i in range(120):
+        client.chat_postMessage(channel=f"U{i}", text="hi")
+    # The workspace-wide cap applies, not one message per second
+    assert clock.now < 120 / 5
+    assert len(client.client.posts) == 120
+
+
+@requires_slack_sdk
+def test_messages_to_one_channel_are_held_to_its_limit(clock):
+    client = RateLimitedClient(FakeWebClient())
+    for _ in range(30):
+        client.chat_postMessage(channel="U1", text="hi")
+    burst = client.channel_bucket("U1").capacity
+    assert clock.now == pytest.approx(30 - burst)
+
+
+@requires_slack_sdk
+def test_rate_limited_message_is_retried_after_its_channel_waits(clock):
+    client = RateLimitedClient(FakeWebClient(rate_limited=["U1"]))
+    client.chat_postMessage(channel="U1", text="hi")
+    assert client.client.posts == ["U1"] and client.throttled == 1
+    assert clock.now == pytest.approx(4)
+    # Other channels do not wait out U1's Retry-After
+    started = clock.now
+    client.chat_postMessage(channel="U2", text="hi")
+    assert clock.now == started
+
+
+def test_breaker_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker(threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert not any(breaker.record_failure() for _ in range(2)) and not breaker.open
+    # Only the failure that opens it says so
+    assert breaker.record_failure() and breaker.open
+    assert not breaker.record_failure()
+    breaker.reset()
+    assert not breaker.open and breaker.failures == 0
+
+
+def test_error_summary_groups_by_code_and_starts_over():
+    errors = ErrorAggregator(samples=2)
+    for i in range(4):
+        errors.add('internal_error', f"failure {i}")
+    errors.add('users_not_found', "nobody")
+    assert len(errors) == 5
+    summary = errors.summary()
+    assert summary.splitlines() == [
+        "🚨 Notion bot run finished with 5 error(s):", "",
+        "*internal_error* × 4", "• failure 0", "• failure 1", "• … and 2 more", "",
+        "*users_not_found* × 1", "• nobody",
+    ]
+    assert errors.summary() is None
+    errors.add('internal_error', "x" * 100)
+    assert len(errors.summary(max_chars=50)) == 50
+
+
+@requires_slack_sdk
+def test_open_breaker_spills_the_remaining_messages(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    client = BrokenWebClient()
+    dispatcher = Dispatcher(client, Directory(), "admin@example.com", concurrency=1,
+                            breaker=CircuitBreaker(threshold=2), spill_path=str(spill_path))
+    codes = []
+    # Unknown recipients say nothing about Slack's health and do not count towards the breaker
+    for email in ["unknown@example.com", "a@example.com", "unknown@example.com", "b@example.com", "c@example.com", "d@example.com"]:
+        dispatcher.submit(email, "hi", "", on_failed=codes.append)
+    dispatcher.drain()
+    assert codes == ['users_not_found', 'internal_error', 'users_not_found', 'internal_error', 'circuit_open', 'circuit_open']
+    assert client.posts == 2 and dispatcher.spilled == 2
+    assert [json.loads(line)['email'] for line in spill_path.read_text().splitlines()] == ["c@example.com", "d@example.com"]
+    assert "*circuit_open* × 1" in dispatcher.errors.summary()
+    dispatcher.shutdown()
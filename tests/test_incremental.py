@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import pytest
+from notion_bot import incremental
+from notion_bot.incremental import sync_snapshot, age_rows, NOTION_FULL_REFRESH_DAYS, NOTION_WATERMARK_OVERLAP_MINUTES
+from notion_bot.request import NOTION_WATERMARK_COLUMN
+from notion_bot.state import StateStore
+
+NOW = datetime(2026, 1, 31, 9, 0)
+
+
+class Table:
+    # Stands in for Snowflake: rows by ID, read through the watermark filter of the changes query
+    def __init__(self):
+        self.rows = {}
+        self.reads = []
+
+    def edit(self, card_id, edited, **values):
+        self.rows[card_id] = dict(ID=card_id, **values, **{NOTION_WATERMARK_COLUMN: edited})
+
+    def stream_rows(self, conn, query, params=None, label="rows"):
+        since = (params or {}).get('since')
+        self.reads.append(since)
+        for row in self.rows.values():
+            if since is None or row[NOTION_WATERMARK_COLUMN] >= since:
+                yield dict(row)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = Table()
+    monkeypatch.setattr(incremental, 'stream_rows', table.stream_rows)
+    return table
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / 'state.db'))
+    yield store
+    store.close()
+
+
+def sync(store, now, keep=None):
+    rows = sync_snapshot(None, store, 'tasks', 'notion_table', ['ID', 'STATUS', 'LEAD_TIME'], 'ID', keep=keep, now=now)
+    return {row['ID']: row for row in rows}
+
+
+def test_only_changes_since_the_watermark_are_read(table, store):
+    table.edit('card-1', NOW - timedelta(hours=2), STATUS='On hold', LEAD_TIME=1)
+    table.edit('card-2', NOW - timedelta(hours=1), STATUS='On hold', LEAD_TIME=2)
+    assert set(sync(store, NOW)) == {'card-1', 'card-2'}
+
+    table.edit('card-2', NOW + timedelta(hours=1), STATUS='Done', LEAD_TIME=2)
+    table.edit('card-3', NOW + timedelta(hours=1), STATUS='On hold', LEAD_TIME=0)
+    rows = sync(store, NOW + timedelta(hours=2))
+    assert table.reads == [None, NOW - timedelta(hours=1, minutes=NOTION_WATERMARK_OVERLAP_MINUTES)]
+    assert {card_id: row['STATUS'] for card_id, row in rows.items()} == {'card-1': 'On hold', 'card-2': 'Done', 'card-3': 'On hold'}
+    assert NOTION_WATERMARK_COLUMN not in rows['card-1']
+
+
+def test_rejected_rows_leave_the_snapshot(table, store):
+    keep = lambda row: row['STATUS'] != 'Done'
+    table.edit('card-1', NOW, STATUS='On hold', LEAD_TIME=1)
+    assert set(sync(store, NOW, keep)) == {'card-1'}
+    table.edit('card-1', NOW + timedelta(hours=1), STATUS='Done', LEAD_TIME=1)
+    assert sync(store, NOW + timedelta(hours=2), keep) == {}
+
+
+def test_deleted_cards_disappear_on_the_next_full_refresh(table, store):
+    table.edit('card-1', NOW, STATUS='On hold', LEAD_TIME=1)
+    table.edit('card-2', NOW, STATUS='On hold', LEAD_TIME=1)
+    sync(store, NOW)
+    del table.rows['card-2']
+    assert set(sync(store, NOW + timedelta(days=1))) == {'card-1', 'card-2'}
+    assert set(sync(store, NOW + timedelta(days=NOTION_FULL_REFRESH_DAYS))) == {'card-1'}
+    assert table.reads[-1] is None
+
+
+def test_unchanged_cards_keep_counting_days(table, store):
+    table.edit('card-1', NOW - timedelta(days=1), STATUS='On hold', LEAD_TIME=3)
+    table.edit('card-2', NOW - timedelta(days=1), STATUS='On hold', LEAD_TIME=None)
+    # Moves the watermark past the overlap, so the first two cards are not read again
+    table.edit('card-3', NOW, STATUS='On hold', LEAD_TIME=0)
+    sync(store, NOW)
+    rows = sync(store, NOW + timedelta(days=2))
+    assert rows['card-1']['LEAD_TIME'] == 5 and rows['card-2']['LEAD_TIME'] is None
+    # Aging is from the day a row was synced, not cumulative across runs
+    assert sync(store, NOW + timedelta(days=3))['card-1']['LEAD_TIME'] == 6
+
+
+def test_age_rows_counts_from_the_sync_day():
+    rows = [{'ID': 'card-1', 'LEAD_TIME': 0, '_SYNCED_ON': '2026-01-29'}]
+    assert list(age_rows(rows, NOW.date())) == [{'ID': 'card-1', 'LEAD_TIME': 2}]
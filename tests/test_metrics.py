@@ -0,0 +1,64 @@
+import json
+from notion_bot.metrics import Metrics, sampled
+
+
+def populated(tmp_path, name):
+    metrics = Metrics(buckets=(0.1, 1.0), path=str(tmp_path / name))
+    metrics.labels = {'shard': '0/2'}
+    metrics.add_time('fetch', 0.25)
+    metrics.add_time('fetch', 0.5)
+    metrics.inc('rules_fired_total', job='tasks', rule='lead_time_4')
+    metrics.inc('rules_fired_total', 2, job='tasks', rule='lead_time_4')
+    metrics.inc('delivery_errors_total', code='say "hi"\n')
+    for seconds in (0.05, 0.5, 3.0):
+        metrics.observe('slack_api_seconds', seconds, method='chat.postMessage')
+    return metrics
+
+
+def test_prometheus_textfile(tmp_path):
+    metrics = populated(tmp_path, 'notion_bot.prom')
+    metrics.export()
+    lines = (tmp_path / 'notion_bot.prom').read_text().splitlines()
+    assert 'notion_bot_stage_seconds_total{shard="0/2",stage="fetch"} 0.75' in lines
+    assert 'notion_bot_stage_calls_total{shard="0/2",stage="fetch"} 2' in lines
+    assert 'notion_bot_rules_fired_total{shard="0/2",job="tasks",rule="lead_time_4"} 3' in lines
+    assert 'notion_bot_delivery_errors_total{shard="0/2",code="say \\"hi\\"\\n"} 1' in lines
+    # Buckets are cumulative and end with +Inf
+    histogram = [line for line in lines if line.startswith('notion_bot_slack_api_seconds')]
+    assert histogram == [
+        'notion_bot_slack_api_seconds_bucket{shard="0/2",method="chat.postMessage",le="0.1"} 1',
+        'notion_bot_slack_api_seconds_bucket{shard="0/2",method="chat.postMessage",le="1.0"} 2',
+        'notion_bot_slack_api_seconds_bucket{shard="0/2",method="chat.postMessage",le="+Inf"} 3',
+        'notion_bot_slack_api_seconds_sum{shard="0/2",method="chat.postMessage"} 3.55',
+        'notion_bot_slack_api_seconds_count{shard="0/2",method="chat.postMessage"} 3',
+    ]
+    assert sum(line.startswith('# TYPE notion_bot_rules_fired_total ') for line in lines) == 1
+    assert not (tmp_path / 'notion_bot.prom.tmp').exists()
+
+
+def test_json_export_and_reset(tmp_path):
+    metrics = populated(tmp_path, 'metrics.json')
+    metrics.export()
+    exported = json.loads((tmp_path / 'metrics.json').read_text())
+    assert exported['labels'] == {'shard': '0/2'}
+    assert exported['stages'] == {'fetch': {'count': 2, 'seconds': 0.75}}
+    assert {'name': 'rules_fired_total', 'labels': {'job': 'tasks', 'rule': 'lead_time_4'}, 'value': 3} in exported['counters']
+    assert exported['histograms'][0]['buckets'] == {'0.1': 1, '1.0': 2, '+Inf': 3}
+    metrics.reset()
+    snapshot = metrics.snapshot()
+    assert snapshot['stages'] == {} and snapshot['counters'] == [] and snapshot['histograms'] == []
+
+
+def test_no_path_exports_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics = Metrics(path='')
+    metrics.inc('rules_fired_total')
+    metrics.export()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_log_sampling_keeps_a_card_in_or_out():
+    kept = [card for card in range(1000) if sampled(card, rate=0.2)]
+    assert 100 < len(kept) < 300
+    assert kept == [card for card in range(1000) if sampled(card, rate=0.2)]
+    assert sampled('card', rate=1) and not sampled('card', rate=0)
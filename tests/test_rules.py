@@ -0,0 +1,332 @@
+import re
+import math
+import zlib
+import random
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from notion_bot.rules import (
+    REVIEWER_VALIDATIONS, STATUS_REVIEWERS_ON_IT, STATUS_ON_HOLD, STATUS_PENDING_INFO,
+    TASK_INDEX, RECO_INDEX, evaluate_task, evaluate_recommendation, task_facts, reco_facts,
+)
+from notion_bot.records import TaskCard, Recommendation, TASK_COLUMNS, RECOMMENDATION_COLUMNS
+from notion_bot.request import build_tasks_query, build_recommendations_query, TASKS_TABLE, RECOMMENDATIONS_TABLE
+from notion_bot.shards import Shard
+
+# The rule engine is checked three ways: against the decisions of the scripts it replaced (main.py
+# and reco.py before the rule table), against the pushed-down WHERE clause run in SQLite, and
+# against the pandas mask of batch mode.
+
+TODAY = date(2026, 1, 31)
+POC = 'poc_username'
+STATUSES = [STATUS_REVIEWERS_ON_IT, STATUS_ON_HOLD, STATUS_PENDING_INFO, '✅ Done']
+
+
+def task_rows(count, seed=0, malformed=False):
+    # Rows as dicts in TASK_COLUMNS; SLAs come as NULL, '', dates, datetimes or ISO strings.
+    # The scripts crashed on NULL LEAD_TIME and on timestamp or malformed strings, so those only
+    # appear with malformed=True.
+    rng = random.Random(seed)
+    for i in range(count):
+        age = rng.randrange(0, 70)
+        sla_kinds = ['null', 'empty', 'str', 'date', 'datetime']
+        if malformed:
+            sla_kinds += ['timestamp', 'bad']
+        sla = {
+            'null': None,
+            'empty': '',
+            'str': (TODAY - timedelta(days=age)).isoformat(),
+            'date': TODAY - timedelta(days=age),
+            'datetime': datetime.combine(TODAY - timedelta(days=age), datetime.min.time()) + timedelta(hours=rng.randrange(24)),
+            'timestamp': f"{(TODAY - timedelta(days=age)).isoformat()}T{rng.randrange(24):02d}:15:00",
+            'bad': rng.choice(['n/a', '31/12/2025', '2025-13-45']),
+        }[rng.choice(sla_kinds)]
+        row = {
+            'ID': f"card-{i}",
+            'REQUEST': f"Request {i}",
+            'STATUS': rng.choice(STATUSES),
+            'LINK': f"https://www.notion.so/card-{i}",
+            'LEAD_TIME': None if malformed and rng.random() < 0.2 else rng.randrange(0, 21),
+            'SLA_PUT_ON_HOLD_ON': sla,
+            'MAIL': rng.choice([None, '', f"creator{i}@example.com", f"creator{i}@example.com"]),
+        }
+        for validation, email_field in REVIEWER_VALIDATIONS:
+            row[validation] = rng.choice([None, '', 'Validated'])
+            row[email_field] = rng.choice([None, '', f"reviewer{i}@example.com"])
+        yield row
+
+
+def recommendation_rows(count, seed=0, malformed=False):
+    rng = random.Random(seed)
+    for i in range(count):
+        eta = (TODAY + timedelta(days=rng.randrange(-30, 31))).strftime("%d/%m/%Y")
+        later = (TODAY + timedelta(days=rng.randrange(-30, 31))).strftime("%d/%m/%Y")
+        initial_kinds = ['eta']
+        if malformed:
+            initial_kinds += ['null', 'empty', 'bad']
+        yield {
+            'RECO': f"https://www.notion.so/reco-{i}",
+            'CONDITION': f"Condition {i}",
+            'OWNER_RECO': rng.choice([None, '', f"owner{i}@example.com", f"owner{i}@example.com"]),
+            'CREATOR_RECO': rng.choice([None, '', f"requestor{i}@example.com"]),
+            'FORMATTED_INITIAL_ETA': {'eta': eta, 'null': None, 'empty': '', 'bad': '2026-01-31'}[rng.choice(initial_kinds)],
+            'FORMATTED_ETA_POSTPONED': rng.choice([None, '', later]),
+        }
+
+
+def fires(rows, evaluate, record_type):
+    return [bool(evaluate(record_type.from_dict(row), TODAY, POC)[0]) for row in rows]
+
+
+# Reference: the decisions of the original scripts, transcribed with today and the POC as parameters
+
+def baseline_task(row, today, poc):
+    # (recipient, message) pairs; reviewer reminders changed wording since, so only their recipient is kept,
+    # and once per card: the scripts sent one per validation and per rule that fired
+    sent = []
+    status, lead_time, sla, creator_email = row['STATUS'], row['LEAD_TIME'], row['SLA_PUT_ON_HOLD_ON'], row['MAIL']
+    link, request_name = row['LINK'], row['REQUEST']
+    creator_slack = creator_email.split('@')[0] if creator_email else None
+
+    def notify_reviewers():
+        for validation, email_field in REVIEWER_VALIDATIONS:
+            if (row[validation] is None or row[validation] == '') and row[email_field] and (row[email_field], 'reviewer') not in sent:
+                sent.append((row[email_field], 'reviewer'))
+
+    def days_since(sla):
+        if isinstance(sla, str):
+            sla = datetime.strptime(sla, "%Y-%m-%d").date()
+        elif isinstance(sla, datetime):
+            sla = sla.date()
+        return (today - sla).days
+
+    if status == STATUS_REVIEWERS_ON_IT:
+        messages = {4: "⏳ This request is under review. Could you please double-check to make sure everything looks good?",
+                    8: "⏳ Just a heads-up, the deadline for this request is coming up soon. Let's make sure we get it done on time!"}
+        if lead_time in messages or lead_time == 10 or (lead_time >= 12 and lead_time % 2 == 0):
+            message = messages.get(lead_time, "🚨 Oops! The deadline for this request has passed. Please respond as soon as you can. Thanks!")
+            if creator_slack:
+                sent.append((creator_email, f"Hey @{creator_slack}\n\n{message}\n\n<{link}|{request_name}>"))
+            else:
+                sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\nThis card doesn't have a creator - Please take care of it\n\n{message}\n\n<{link}|{request_name}>"))
+            notify_reviewers()
+    elif status == STATUS_ON_HOLD:
+        on_hold = "😴 This request is on hold for now. Could you please provide an update?"
+        if sla:
+            days_since_sla = days_since(sla)
+            if days_since_sla % 30 == 0 and days_since_sla > 0:
+                if not creator_slack:
+                    sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\n⚠️ Error: This card doesn't have a creator - Please take care of it\n\n{on_hold}\n\n<{link}|{request_name}>"))
+                else:
+                    sent.append((creator_email, f"Hey @{creator_slack}\n\n{on_hold}\n\n<{link}|{request_name}>"))
+                notify_reviewers()
+        else:
+            sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\n⚠️ Error: This card has no SLA - Please take care of it\n\n{on_hold}\n\n<{link}|{request_name}>"))
+            notify_reviewers()
+        if sla and not creator_email:
+            sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\n⚠️ Error: This card has a SLA but no creator - Please take care of it\n\n{on_hold}\n\n<{link}|{request_name}>"))
+            notify_reviewers()
+    elif status == STATUS_PENDING_INFO:
+        message = "👀 This request needs a bit more information to be processed. Could you please take a look and make sure everything looks good?"
+        if sla:
+            days_since_sla = days_since(sla)
+            if days_since_sla >= 5 and (days_since_sla - 5) % 5 == 0:
+                if creator_slack:
+                    sent.append((creator_email, f"Hey @{creator_slack}\n\n{message}\n\n<{link}|{request_name}>"))
+                else:
+                    sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\nThis card doesn't have creator - Please take care of it\n\n{message}\n\n<{link}|{request_name}>"))
+                notify_reviewers()
+        else:
+            sent.append((f"{poc}@example.com", f"Hey @{poc}\n\n*Issue : {status}*\n⚠️ This card has no SLA - Please Take Care of It\n\n{message}\n\n<{link}|{request_name}>"))
+            notify_reviewers()
+    return sorted(sent)
+
+
+def baseline_recommendation(row, today, poc):
+    sent = []
+    reco_link, owner_reco, creator_reco, condition = row['RECO'], row['OWNER_RECO'], row['CREATOR_RECO'], row['CONDITION']
+    if not owner_reco:
+        return [(f"{poc}@example.com", f"*Issue 🚨 : No Owner*\nHey @{poc}, This card has no owner. Please have a look.\n\nLink = <{reco_link}|{condition}>")]
+    eta_date = datetime.strptime(row['FORMATTED_ETA_POSTPONED'] or row['FORMATTED_INITIAL_ETA'], "%d/%m/%Y").date()
+    days_until_eta = (eta_date - today).days
+
+    def send_messages(recipient, is_creator=False):
+        name = recipient.split('@')[0]
+        if days_until_eta == 10:
+            if is_creator:
+                message = f"Hey @{name}\n\n⏳ Your recommendation card is waiting for you! Please do not forget to contact the @{owner_reco.split('@')[0]} of the card to make sure it is currently being implemented."
+            else:
+                message = f"Hey @{name}\n\n⏳ Your recommendation card is waiting for you! Please do not forget to contact the Requestor of the card to keep him informed of the progress of the recommendation's implementation and, if necessary, ask him questions to implement it properly."
+        elif days_until_eta == 0:
+            if is_creator:
+                message = f"Hey @{name}\n\n⚠️ Your recommendation's ETA is coming to an end. Please do not forget to complete it with your rationale for closure, or to postpone the ETA if needed."
+            else:
+                message = f"Hey @{name}\n\n⚠️ Your recommendation's ETA is coming to an end. Please do not forget to complete it with your audit trail, or to notify the Requestor that the implementation of your recommendation has to be postponed."
+        elif days_until_eta < 0 and abs(days_until_eta) % 2 == 0:
+            message = f"Hey @{name}\n\n🚨 Your recommendation card is late! Please have a look and update it accordingly."
+        else:
+            return
+        sent.append((recipient, message + f"\n\nLink = <{reco_link}|{condition}>"))
+
+    send_messages(owner_reco)
+    if creator_reco:
+        send_messages(creator_reco, is_creator=True)
+    return sorted(sent)
+
+
+def decisions(notifications):
+    return sorted((n.recipient, 'reviewer' if n.rule.startswith('reviewer:') else n.message) for n in notifications)
+
+
+def test_tasks_match_baseline():
+    for row in task_rows(5000):
+        _, notifications = evaluate_task(TaskCard.from_dict(row), TODAY, POC)
+        assert decisions(notifications) == baseline_task(row, TODAY, POC), row
+
+
+def test_recommendations_match_baseline():
+    for row in recommendation_rows(5000):
+        _, notifications = evaluate_recommendation(Recommendation.from_dict(row), TODAY, POC)
+        assert decisions(notifications) == baseline_recommendation(row, TODAY, POC), row
+
+
+@pytest.mark.parametrize('sla', ['2025-12-02T09:30:00', '2025-12-02 23:59:59.999', datetime(2025, 12, 2, 23, 0),
+                                 datetime(2025, 12, 2, 23, 0, tzinfo=timezone(timedelta(hours=-5))), date(2025, 12, 2)])
+def test_timestamp_sla_counts_its_calendar_day(sla):
+    card = TaskCard.from_dict({'STATUS': STATUS_ON_HOLD, 'SLA_PUT_ON_HOLD_ON': sla, 'MAIL': 'creator@example.com'})
+    assert task_facts(card, TODAY)['days_since_sla'] == 60
+    assert [rule.name for rule in evaluate_task(card, TODAY, POC)[0]] == ['on_hold_cycle']
+
+
+@pytest.mark.parametrize('sla', [None, '', 'n/a', '2025-13-45', '31/12/2025'])
+@pytest.mark.parametrize('status, rule', [(STATUS_ON_HOLD, 'on_hold_no_sla'), (STATUS_PENDING_INFO, 'pending_info_no_sla')])
+def test_missing_or_malformed_sla_is_no_sla(sla, status, rule):
+    card = TaskCard.from_dict({'STATUS': status, 'SLA_PUT_ON_HOLD_ON': sla, 'MAIL': 'creator@example.com'})
+    assert [fired.name for fired in evaluate_task(card, TODAY, POC)[0]] == [rule]
+
+
+def test_reviewers_get_one_reminder_per_card():
+    card = TaskCard.from_dict({'ID': 'card-1', 'STATUS': STATUS_ON_HOLD, 'SLA_PUT_ON_HOLD_ON': TODAY - timedelta(days=60),
+                               'MAIL': None, 'REGULATORY_FINAL_VALIDATION': None, 'REGULATORY_REVIEWER_EMAIL': 'reviewer@example.com',
+                               'LEGAL_FINAL_VALIDATION': '', 'LEGAL_REVIEWER_EMAIL': 'reviewer@example.com'})
+    rules, notifications = evaluate_task(card, TODAY, POC)
+    assert [rule.name for rule in rules] == ['on_hold_cycle', 'on_hold_no_creator']
+    assert [n.rule for n in notifications if n.recipient == 'reviewer@example.com'] == ['reviewer:on_hold_cycle']
+
+
+def test_missing_lead_time_does_not_fire():
+    card = TaskCard.from_dict({'STATUS': STATUS_REVIEWERS_ON_IT, 'LEAD_TIME': None, 'MAIL': 'creator@example.com'})
+    assert evaluate_task(card, TODAY, POC) == ([], [])
+
+
+@pytest.mark.parametrize('initial, postponed', [(None, None), ('', ''), ('', None), ('2026-01-31', None), ('31/01/2026', 'soon')])
+def test_missing_or_malformed_eta_does_not_fire(initial, postponed):
+    reco = Recommendation.from_dict({'RECO': 'https://www.notion.so/reco', 'OWNER_RECO': 'owner@example.com',
+                                     'FORMATTED_INITIAL_ETA': initial, 'FORMATTED_ETA_POSTPONED': postponed})
+    assert reco_facts(reco, TODAY)['days_until_eta'] is None
+    assert evaluate_recommendation(reco, TODAY, POC) == ([], [])
+
+
+def test_empty_postponed_eta_falls_back_to_initial():
+    reco = Recommendation.from_dict({'OWNER_RECO': 'owner@example.com', 'FORMATTED_INITIAL_ETA': '10/02/2026',
+                                     'FORMATTED_ETA_POSTPONED': ''})
+    assert [rule.name for rule in evaluate_recommendation(reco, TODAY, POC)[0]] == ['eta_10']
+
+
+# Pushdown: the WHERE clause sent to Snowflake, run in SQLite with its Snowflake functions emulated
+
+def _try_to_date(value, fmt):
+    fmt = {'YYYY-MM-DD': "%Y-%m-%d", 'DD/MM/YYYY': "%d/%m/%Y"}[fmt]
+    try:
+        return datetime.strptime(value, fmt).date().isoformat() if value is not None else None
+    except ValueError:
+        return None
+
+
+def _datediff(part, start, end):
+    if start is None or end is None:
+        return None
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days
+
+
+def _sql_value(value):
+    if isinstance(value, datetime):
+        # Snowflake's TO_VARCHAR of a timestamp, e.g. '2026-01-01 10:00:00.000'
+        return value.strftime("%Y-%m-%d %H:%M:%S.000")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def run_query(table, columns, rows, query, params):
+    db = sqlite3.connect(':memory:')
+    db.create_function('TRY_TO_DATE', 2, _try_to_date)
+    db.create_function('TO_VARCHAR', 1, lambda value: None if value is None else str(value))
+    db.create_function('LEFT_', 2, lambda value, n: None if value is None else value[:n])
+    db.create_function('DATEDIFF', 3, _datediff)
+    db.create_function('MOD', 2, lambda a, b: None if a is None else math.fmod(a, b))
+    db.create_function('HASH', 1, lambda value: zlib.crc32(str(value).encode()))
+    db.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+    db.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                   [[_sql_value(row[column]) for column in columns] for row in rows])
+    # LEFT is a keyword in SQLite, and bind parameters are named :name there
+    query = query.replace("DATEDIFF(day,", "DATEDIFF('day',").replace("LEFT(", "LEFT_(")
+    query = re.sub(r"%\((\w+)\)s", r":\1", query)
+    params = dict(params, today=TODAY.isoformat())
+    return [row[0] for row in db.execute(f"SELECT {columns[0]} FROM ({query})", params)]
+
+
+def test_task_pushdown_selects_the_cards_that_fire():
+    rows = list(task_rows(3000, seed=1, malformed=True))
+    selected = set(run_query(TASKS_TABLE, TASK_COLUMNS, rows, *build_tasks_query(pushdown=True)))
+    expected = {row['ID'] for row, fired in zip(rows, fires(rows, evaluate_task, TaskCard)) if fired}
+    assert selected == expected
+
+
+def test_recommendation_pushdown_selects_the_recommendations_that_fire():
+    rows = list(recommendation_rows(3000, seed=1, malformed=True))
+    selected = set(run_query(RECOMMENDATIONS_TABLE, RECOMMENDATION_COLUMNS, rows, *build_recommendations_query(pushdown=True)))
+    expected = {row['RECO'] for row, fired in zip(rows, fires(rows, evaluate_recommendation, Recommendation)) if fired}
+    assert selected == expected
+
+
+def test_shards_partition_the_pushed_down_rows():
+    rows = list(task_rows(1000, seed=2, malformed=True))
+    everything = run_query(TASKS_TABLE, TASK_COLUMNS, rows, *build_tasks_query(pushdown=True))
+    shards = [run_query(TASKS_TABLE, TASK_COLUMNS, rows, *build_tasks_query(pushdown=True, shard=Shard(index, 3)))
+              for index in range(3)]
+    assert sorted(sum(shards, [])) == sorted(everything)
+    assert all(shards)
+
+
+# Batch mode: the pandas mask must keep the same rows as the row engine
+
+def test_batch_task_mask_matches_rows():
+    pd = pytest.importorskip('pandas')
+    from notion_bot import batch
+    rows = list(task_rows(3000, seed=3, malformed=True))
+    df = pd.DataFrame(rows, columns=TASK_COLUMNS)
+    mask = batch.rules_mask(TASK_INDEX, df['STATUS'], batch.task_facts(df, TODAY))
+    assert list(mask) == fires(rows, evaluate_task, TaskCard)
+
+
+def test_batch_task_mask_reads_timestamp_columns_by_calendar_day():
+    pd = pytest.importorskip('pandas')
+    from notion_bot import batch
+    rows = [dict(row, STATUS=STATUS_ON_HOLD) for row in task_rows(500, seed=4)]
+    for row in rows:
+        sla = row['SLA_PUT_ON_HOLD_ON']
+        row['SLA_PUT_ON_HOLD_ON'] = (datetime.fromisoformat(str(sla)) + timedelta(hours=23)) if sla else None
+    df = pd.DataFrame(rows, columns=TASK_COLUMNS)
+    df['SLA_PUT_ON_HOLD_ON'] = pd.to_datetime(df['SLA_PUT_ON_HOLD_ON']).dt.tz_localize('America/New_York')
+    mask = batch.rules_mask(TASK_INDEX, df['STATUS'], batch.task_facts(df, TODAY))
+    assert list(mask) == fires(rows, evaluate_task, TaskCard)
+
+
+def test_batch_recommendation_mask_matches_rows():
+    pd = pytest.importorskip('pandas')
+    from notion_bot import batch
+    rows = list(recommendation_rows(3000, seed=3, malformed=True))
+    df = pd.DataFrame(rows, columns=RECOMMENDATION_COLUMNS)
+    mask = batch.rules_mask(RECO_INDEX, None, batch.reco_facts(df, TODAY))
+    assert list(mask) == fires(rows, evaluate_recommendation, Recommendation)
@@ -0,0 +1,67 @@
+import os
+from datetime import date, datetime, timedelta
+import pytest
+from notion_bot.shards import Shard, ShardLease, job_key, shard_path
+
+DAY = date(2026, 1, 31)
+NOW = datetime(2026, 1, 31, 9, 0)
+SHARD = Shard(1, 4)
+
+
+@pytest.fixture
+def lease(tmp_path):
+    return lambda: ShardLease('tasks', DAY, SHARD, directory=str(tmp_path), ttl_minutes=60)
+
+
+def test_one_worker_holds_a_running_shard(lease):
+    first, second = lease(), lease()
+    assert first.acquire(now=NOW)
+    assert not second.acquire(now=NOW + timedelta(minutes=30))
+
+
+def test_finished_shard_is_not_run_again(lease):
+    first = lease()
+    first.acquire(now=NOW)
+    first.release(True)
+    assert not lease().acquire(now=NOW + timedelta(days=1))
+
+
+def test_failed_shard_is_taken_over(lease):
+    first = lease()
+    first.acquire(now=NOW)
+    first.release(False)
+    second = lease()
+    assert second.acquire(now=NOW)
+    assert second.path.endswith(f"tasks-{DAY.isoformat()}-1of4.2.lease")
+
+
+def test_stale_lease_is_taken_over(lease):
+    lease().acquire(now=NOW)
+    assert not lease().acquire(now=NOW + timedelta(minutes=59))
+    assert lease().acquire(now=NOW + timedelta(minutes=61))
+
+
+def test_half_written_lease_counts_as_running(lease, tmp_path):
+    open(tmp_path / f"tasks-{DAY.isoformat()}-1of4.1.lease", 'w').close()
+    assert not lease().acquire(now=datetime.now())
+
+
+def test_shard_names():
+    assert job_key('tasks', None) == 'tasks'
+    assert job_key('tasks', SHARD) == 'tasks:1of4'
+    assert shard_path(os.path.join('metrics', 'notion_bot.prom'), SHARD) == os.path.join('metrics', 'notion_bot.1of4.prom')
+    assert shard_path(None, SHARD) is None
+
+
+def test_shard_stays_with_the_store_that_ran_it_first(tmp_path):
+    def lease(store_id, day=DAY):
+        return ShardLease('tasks', day, SHARD, directory=str(tmp_path), ttl_minutes=60, store_id=store_id)
+
+    first = lease('store-a')
+    assert first.acquire(now=NOW)
+    first.release(False)
+    # Another container cannot see what store-a delivered, so it must not take over the failed shard
+    assert not lease('store-b').acquire(now=NOW)
+    assert lease('store-a').acquire(now=NOW)
+    assert not lease('store-b', DAY + timedelta(days=1)).acquire(now=NOW + timedelta(days=1))
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
@@ -0,0 +1,144 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from notion_bot import notifier
+from notion_bot.dispatch import ErrorAggregator
+from notion_bot.state import (
+    StateStore, backoff_delay, NOTION_OUTBOX_TTL_HOURS, NOTION_OUTBOX_MAX_BACKOFF_SECONDS, NOTION_OUTBOX_CLAIM_SECONDS,
+)
+
+DAY = date(2026, 1, 31)
+NOW = datetime(2026, 1, 31, 9, 0)
+KEY = ('card-1', 'creator@example.com', 'lead_time_4', DAY)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / 'state.db'))
+    yield store
+    store.close()
+
+
+def enqueue(store, key=KEY, now=NOW):
+    card_id, recipient, rule, day = key
+    return store.enqueue('tasks', day, card_id, recipient, rule, "message", "https://www.notion.so/card-1", now=now)
+
+
+def test_enqueue_keeps_one_entry_per_key(store):
+    assert enqueue(store)
+    assert not enqueue(store)
+    # The enqueuing worker delivers it; others only get it once the claim runs out
+    assert store.due(now=NOW) == []
+    assert store.next_attempt(now=NOW) is None
+    later = NOW + timedelta(seconds=NOTION_OUTBOX_CLAIM_SECONDS)
+    assert [entry[:4] for entry in store.due(now=later)] == [KEY]
+    assert store.due(now=later) == []
+
+
+def test_failures_back_off_exponentially(store):
+    enqueue(store)
+    store.record_failure(*KEY, 'ratelimited', now=NOW)
+    assert store.due(now=NOW) == []
+    assert store.next_attempt(now=NOW) == NOW + timedelta(seconds=backoff_delay(1))
+    store.record_failure(*KEY, 'ratelimited', now=NOW)
+    assert store.next_attempt(now=NOW) == NOW + timedelta(seconds=backoff_delay(2))
+    assert backoff_delay(2) == 2 * backoff_delay(1)
+    assert len(store.due(now=NOW + timedelta(seconds=backoff_delay(2)))) == 1
+
+
+def _claim(path, now):
+    store = StateStore(path)
+    try:
+        return [entry[0] for entry in store.due(now=now)]
+    finally:
+        store.close()
+
+
+def test_workers_sharing_the_store_never_claim_the_same_entry(tmp_path):
+    path = str(tmp_path / 'state.db')
+    store = StateStore(path)
+    for i in range(200):
+        key = (f"card-{i}",) + KEY[1:]
+        enqueue(store, key)
+        store.record_failure(*key, 'ratelimited', now=NOW)
+    retry_at = NOW + timedelta(seconds=backoff_delay(1))
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        claims = list(pool.map(_claim, [path] * 8, [retry_at] * 8))
+    claimed = [card_id for claim in claims for card_id in claim]
+    assert sorted(claimed) == sorted(f"card-{i}" for i in range(200))
+    # Entries a worker has just enqueued are not handed to the others
+    enqueue(store, ('card-new',) + KEY[1:], now=retry_at)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(_claim, path, retry_at).result() == []
+    store.close()
+
+
+def test_backoff_is_capped():
+    assert backoff_delay(100) == NOTION_OUTBOX_MAX_BACKOFF_SECONDS
+
+
+def test_sent_notifications_leave_the_outbox(store):
+    enqueue(store)
+    store.record_sent(*KEY)
+    assert store.due(now=NOW) == []
+    assert store.already_sent(*KEY)
+
+
+def test_stale_notifications_expire(store):
+    enqueue(store)
+    store.record_failure(*KEY, 'fatal_error', now=NOW)
+    assert store.expire(now=NOW) == []
+    expired = store.expire(now=NOW + timedelta(hours=NOTION_OUTBOX_TTL_HOURS))
+    assert expired == [('card-1', 'creator@example.com', 'lead_time_4', 1, 'fatal_error')]
+    assert store.next_attempt(now=NOW) is None
+
+
+def test_recipient_errors_are_not_retried(store, monkeypatch):
+    monkeypatch.setattr(notifier, 'clients', SimpleNamespace(state=store))
+    enqueue(store)
+    notifier.record_failure(KEY, 'users_not_found')
+    assert store.next_attempt(now=NOW) is None
+    assert not store.already_sent(*KEY)
+
+    enqueue(store)
+    notifier.record_failure(KEY, 'ratelimited')
+    assert store.next_attempt(now=NOW) is not None
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.errors = ErrorAggregator()
+        self.breaker = SimpleNamespace(open=False)
+        self.submitted = []
+        self.summaries = []
+
+    def submit(self, email, message, link, on_sent=None, on_failed=None):
+        self.submitted.append(email)
+        on_sent()
+
+    def drain(self):
+        return {'sent': len(self.submitted)}
+
+    def report_errors(self):
+        self.summaries.append(self.errors.summary())
+
+
+def test_close_does_not_flush_a_flushed_run_again(store, monkeypatch):
+    dispatcher = FakeDispatcher()
+    monkeypatch.setattr(notifier, 'clients', SimpleNamespace(
+        state=store, dispatcher=dispatcher, built=lambda name: name == 'dispatcher', close=lambda: None))
+    retries = []
+    monkeypatch.setattr(notifier, 'retry_outbox', lambda: retries.append(1))
+    monkeypatch.setattr(notifier, 'flushed', True)
+
+    notifier.notify('tasks', DAY, 'creator@example.com', "message", "https://www.notion.so/card-1", 'card-1', 'lead_time_4')
+    notifier.flush()
+    notifier.close()
+    assert dispatcher.submitted == ['creator@example.com']
+    assert len(retries) == len(dispatcher.summaries) == 1
+
+    # An error reported after the flush still reaches the admin
+    notifier.report_error("Snowflake went away")
+    notifier.close()
+    assert len(dispatcher.summaries) == 2 and "Snowflake went away" in dispatcher.summaries[1]
@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from notion_bot import tasks
+from notion_bot.records import TaskCard
+from notion_bot.rules import STATUS_REVIEWERS_ON_IT
+from notion_bot.state import StateStore
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def sent(tmp_path, monkeypatch):
+    store = StateStore(str(tmp_path / 'state.db'))
+    monkeypatch.setattr(tasks, 'clients', SimpleNamespace(state=store))
+    sent = []
+    monkeypatch.setattr(tasks, 'send_to_slack', lambda *notification: sent.append(notification))
+    yield sent
+    store.close()
+
+
+def overdue_card(lead_time):
+    return TaskCard.from_dict({'ID': 'card-1', 'STATUS': STATUS_REVIEWERS_ON_IT, 'LEAD_TIME': lead_time, 'MAIL': 'creator@example.com'})
+
+
+def rules(sent):
+    return [notification[4] for notification in sent]
+
+
+@pytest.mark.parametrize('days_ahead', [0, 2, 5])
+def test_a_run_does_not_follow_up_on_cards_it_just_tracked(sent, monkeypatch, days_ahead):
+    # Also for plans of a later day, which track cards as on that day
+    monkeypatch.setattr(tasks, 'run_day', TODAY + timedelta(days=days_ahead))
+    tasks.process_rows([overdue_card(12)])
+    assert rules(sent) == ['lead_time_overdue']
+
+
+def test_overdue_card_is_followed_up_two_days_later(sent, monkeypatch):
+    monkeypatch.setattr(tasks, 'run_day', TODAY)
+    tasks.process_rows([overdue_card(12)])
+    monkeypatch.setattr(tasks, 'run_day', TODAY + timedelta(days=1))
+    tasks.process_rows([])
+    monkeypatch.setattr(tasks, 'run_day', TODAY + timedelta(days=2))
+    tasks.process_rows([])
+    assert rules(sent) == ['lead_time_overdue', 'overdue_followup']
+
+
+def test_follow_up_counts_calendar_days(sent):
+    tracked = datetime.combine(TODAY, datetime.min.time()).replace(hour=9, second=5)
+    tasks.clients.state.track_overdue('card-1', 'creator@example.com', tracked)
+    tasks.check_overdue_cards(tracked + timedelta(days=1, hours=14))
+    assert rules(sent) == []
+    # Two days later, a few seconds earlier in the day than the run that tracked the card
+    tasks.check_overdue_cards(tracked + timedelta(days=2, seconds=-5))
+    assert rules(sent) == ['overdue_followup']
+
+
+def test_incremental_snapshot_is_aged_to_the_run_day(monkeypatch):
+    synced = {}
+    monkeypatch.setattr(tasks, 'NOTION_BOT_INCREMENTAL', True)
+    monkeypatch.setattr(tasks, 'clients', SimpleNamespace(state=None))
+    monkeypatch.setattr(tasks, 'sync_snapshot', lambda *args, **kwargs: synced.update(kwargs) or [])
+    monkeypatch.setattr(tasks, 'run_day', TODAY + timedelta(days=3))
+    list(tasks.fetch_rows(None))
+    assert synced['now'].date() == TODAY + timedelta(days=3)